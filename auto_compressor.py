@@ -0,0 +1,195 @@
+import numpy as np
+from PIL import Image
+import os
+import time
+from multiprocessing import Pool
+from LZW import LZWCoding
+from image_compressor import ImageCompressor
+from level3_compressor import Level3Compressor
+from level4_compressor import Level4Compressor
+from level5_compressor import Level5Compressor
+from high_bit_depth_compressor import (HighBitDepthCompressor, is_high_bit_depth, sample_array,
+                                       wrapped_differences)
+from color_transform import COLOR_TRANSFORMS
+from image_modes import split_planes
+
+# Automatic level and parameter selection. A few small sample regions of the
+# input are encoded with every candidate configuration (level, predictor/colour
+# transform and code length) on a process pool, the configuration with the best
+# estimated ratio found within the time budget is kept and the full compression
+# is then run with it. 16-bit grayscale images only have Level 6 (two byte
+# planes, see high_bit_depth_compressor.py), only its code length is selected.
+# ------------------------------------------------------------------------------
+LEVEL_CLASSES = {2: ImageCompressor, 3: Level3Compressor,
+                 4: Level4Compressor, 5: Level5Compressor, 6: HighBitDepthCompressor}
+LZW_TYPES = {1: 'level1', 2: 'level2', 3: 'level3', 4: 'level4', 5: 'level5', 6: 'level4'}
+CODELENGTHS = [9, 10, 12, 14, 16]
+
+
+def is_text_file(path):
+    """Text inputs go to Level 1, everything else is treated as an image"""
+    return path.lower().endswith('.txt')
+
+
+def is_grayscale(img):
+    """Grayscale images can use Level 2/3 without losing information"""
+    if img.mode == 'L':
+        return True
+    if img.mode == 'RGB':
+        r, g, b = (np.array(channel) for channel in img.split())
+        return np.array_equal(r, g) and np.array_equal(g, b)
+    return False
+
+
+def _sample_strings(candidate, samples):
+    """Turn the samples into the symbol strings the candidate level would encode"""
+    level = candidate['level']
+    if level == 1:
+        return samples
+    if level == 6:
+        values = [wrapped_differences(sample_array(sample)) for sample in samples]
+        return [''.join([chr(x) for x in plane.flatten()])
+                for value in values for plane in (value >> 8, value & 0xFF)]
+    if level in (2, 3):
+        planes = [np.array(sample.convert('L')) for sample in samples]
+    else:
+        planes = [plane for sample in samples
+                  for plane in split_planes(sample, candidate['color_transform'])[1]]
+    if level in (2, 4):
+        return [''.join([chr(x) for x in plane.flatten()]) for plane in planes]
+    differences = Level3Compressor.calculate_differences
+    return [''.join([chr((int(x) + 255) & 0x1FF) for x in differences(plane).flatten()])
+            for plane in planes]
+
+
+def estimate_candidate(candidate, samples):
+    """Return the number of bits the candidate needs for the samples"""
+    lzw = LZWCoding('sample', LZW_TYPES[candidate['level']], candidate['codelength'])
+    codes = sum(len(lzw.encode(string)) for string in _sample_strings(candidate, samples) if string)
+    return codes * lzw.codelength
+
+
+class AutoCompressor:
+    def __init__(self, input_path, time_budget=5.0, sample_count=4, sample_size=96,
+                 max_workers=None):
+        self.input_path = input_path
+        self.time_budget = time_budget
+        self.sample_count = sample_count
+        self.sample_size = sample_size
+        self.max_workers = max_workers
+        self.original_size = os.path.getsize(input_path)
+        self.config = None
+        self.estimated_ratio = None
+        self.compression_ratio = None
+        # optional progress callback handed to the LZW coders of the full run
+        self.progress = None
+
+    def get_samples(self):
+        """Cut sample_count evenly spaced regions out of the input"""
+        if is_text_file(self.input_path):
+            with open(self.input_path, 'r', encoding='utf-8') as f:
+                text = f.read()
+            # a text sample holds as many characters as an image sample has pixels
+            chunk = self.sample_size * self.sample_size
+            if len(text) <= chunk * self.sample_count:
+                return [text]
+            step = (len(text) - chunk) // (self.sample_count - 1) if self.sample_count > 1 else 0
+            return [text[i * step:i * step + chunk] for i in range(self.sample_count)]
+
+        img = Image.open(self.input_path)
+        img.load()
+        width, height = img.size
+        size_x, size_y = min(self.sample_size, width), min(self.sample_size, height)
+        xs = np.linspace(0, width - size_x, self.sample_count).astype(int)
+        ys = np.linspace(0, height - size_y, self.sample_count).astype(int)
+        boxes = sorted({(int(x), int(y), int(x) + size_x, int(y) + size_y) for x, y in zip(xs, ys)})
+        return [img.crop(box) for box in boxes]
+
+    def get_candidates(self):
+        """List the candidate configurations, cheapest first"""
+        if is_text_file(self.input_path):
+            return [{'level': 1, 'codelength': codelength} for codelength in CODELENGTHS]
+        img = Image.open(self.input_path)
+        if is_high_bit_depth(img):
+            levels = [(6, 'none')]
+        elif is_grayscale(img):
+            levels = [(2, 'none'), (3, 'none')]
+        else:
+            levels = [(level, transform) for level in (4, 5) for transform in COLOR_TRANSFORMS]
+        candidates = []
+        for codelength in CODELENGTHS:
+            for level, transform in levels:
+                initial_dict_size = LZWCoding('sample', LZW_TYPES[level]).initial_dict_size
+                if (1 << codelength) > initial_dict_size:
+                    candidates.append({'level': level, 'color_transform': transform,
+                                       'codelength': codelength})
+        return candidates
+
+    def select(self):
+        """Try every candidate on the samples in parallel and keep the best one"""
+        samples = self.get_samples()
+        candidates = self.get_candidates()
+        sample_bytes = sum(len(sample.encode('utf-8')) if isinstance(sample, str)
+                           else sample.size[0] * sample.size[1] * len(sample.getbands())
+                           * (2 if is_high_bit_depth(sample) else 1)
+                           for sample in samples)
+
+        start = time.time()
+        deadline = start + self.time_budget
+        # a multiprocessing pool, because its workers can be terminated: the
+        # candidates still running when the budget is spent are given up and
+        # do not keep using CPU
+        pool = Pool(processes=self.max_workers)
+        try:
+            pending = [pool.apply_async(estimate_candidate, (candidate, samples))
+                       for candidate in candidates]
+            for job in pending:
+                job.wait(max(0.0, deadline - time.time()))
+        finally:
+            pool.terminate()
+            pool.join()
+
+        results = [(job.get(), index) for index, job in enumerate(pending)
+                   if job.ready() and job.successful()]
+        print(f"Auto - evaluated {len(results)}/{len(candidates)} candidates "
+              f"in {time.time() - start:.2f}s")
+        if not results:
+            # nothing finished within the budget, fall back to the first candidate
+            self.config = candidates[0]
+            self.estimated_ratio = None
+            return self.config
+
+        bits, index = min(results)
+        self.config = candidates[index]
+        self.estimated_ratio = sample_bytes / (bits / 8) if bits else None
+        print(f"Auto - selected configuration: {self.config}")
+        if self.estimated_ratio:
+            print(f"Auto - estimated compression ratio: {self.estimated_ratio:.2f}")
+        return self.config
+
+    def compress(self):
+        """Select a configuration (unless already selected) and compress with it"""
+        if self.config is None:
+            self.select()
+        config = self.config
+
+        if config['level'] == 1:
+            lzw = LZWCoding(os.path.splitext(self.input_path)[0], 'level1', config['codelength'])
+            lzw.progress = self.progress
+            output_path, stats = lzw.compress_text_file()
+            self.compression_ratio = self.original_size / os.path.getsize(output_path)
+            return output_path
+
+        compressor_class = LEVEL_CLASSES[config['level']]
+        if config['level'] in (4, 5):
+            compressor = compressor_class(self.input_path, color_transform=config['color_transform'],
+                                          codelength=config['codelength'])
+        else:
+            compressor = compressor_class(self.input_path, codelength=config['codelength'])
+        for lzw in compressor.coders:
+            lzw.progress = self.progress
+        compressor.compress()
+        self.compression_ratio = compressor.compression_ratio
+        suffixes = {2: '.compressed', 6: '.hbd.compressed'}
+        suffix = suffixes.get(config['level'], f".level{config['level']}.compressed")
+        return f"{self.input_path}{suffix}"
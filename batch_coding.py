@@ -0,0 +1,111 @@
+import struct
+from functools import partial
+from itertools import accumulate
+from LZW import LZWCoding, GROWTH_STRATEGIES, REPLACEMENT_POLICIES, option_name
+from pipeline import pack_codes
+
+# Batches of many small records (log lines, JSON documents, ...) coded like
+# Level 1 with one LZWCoding and its reused tables (encode_many/decode_many).
+# Every record gets its own dictionary, so records are decoded independently.
+#
+# Batch buffer: b'LZWB', code length, growth strategy, replacement policy
+# (1 byte each), the number of records (4 bytes), the code offset of every
+# record and the end offset (4 bytes each) and all codes (2 bytes each). The
+# offsets make every record readable without decoding the others (read_record).
+#
+# With workers > 1 the records are split into shards that are coded on a
+# process pool and the shards are joined into one buffer. Only the core codec
+# is imported up front (the process pool is imported when it is used), so short
+# lived batch jobs start quickly.
+# ------------------------------------------------------------------------------
+BATCH_MAGIC = b'LZWB'
+# shards per worker (smaller shards balance the load better)
+SHARDS_PER_WORKER = 4
+
+
+def record_texts(records):
+    """Records are bytes or str (utf-8 encoded), coded as latin-1 characters"""
+    return [(record.encode('utf-8') if isinstance(record, str) else bytes(record)).decode('latin-1')
+            for record in records]
+
+
+def encode_shard(texts, codelength=None, growth='lzw', replacement='freeze'):
+    """Return (number of codes of every record, packed codes) of a shard"""
+    lzw = LZWCoding('batch', 'level1', codelength, growth=growth, replacement=replacement)
+    encoded = lzw.encode_many(texts)
+    return [len(codes) for codes in encoded], pack_codes([code for codes in encoded for code in codes])
+
+
+def decode_shard(code_lists, codelength=None, growth='lzw', replacement='freeze'):
+    lzw = LZWCoding('batch', 'level1', codelength, growth=growth, replacement=replacement)
+    return [text.encode('latin-1') for text in lzw.decode_many(code_lists)]
+
+
+def split_shards(items, workers):
+    size = max(1, -(-len(items) // (workers * SHARDS_PER_WORKER)))
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+def encode_batch(records, codelength=None, growth='lzw', replacement='freeze', workers=None):
+    """Compress a list of records (bytes or str) into one batch buffer"""
+    texts = record_texts(records)
+    lzw = LZWCoding('batch', 'level1', codelength, growth=growth, replacement=replacement)
+    if workers and workers > 1 and len(texts) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        shards = split_shards(texts, workers)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(partial(encode_shard, codelength=lzw.codelength, growth=growth,
+                                            replacement=replacement), shards))
+    else:
+        results = [encode_shard(texts, lzw.codelength, growth, replacement)]
+
+    lengths = [length for shard_lengths, _ in results for length in shard_lengths]
+    offsets = list(accumulate(lengths, initial=0))
+    return b''.join([BATCH_MAGIC,
+                     lzw.codelength.to_bytes(1, byteorder='big'),
+                     GROWTH_STRATEGIES[growth].to_bytes(1, byteorder='big'),
+                     REPLACEMENT_POLICIES[replacement].to_bytes(1, byteorder='big'),
+                     len(lengths).to_bytes(4, byteorder='big'),
+                     struct.pack(f'>{len(offsets)}I', *offsets)] + [codes for _, codes in results])
+
+
+def read_batch_header(buffer):
+    """Return (codelength, growth, replacement, offsets, start of the codes)"""
+    if buffer[:4] != BATCH_MAGIC:
+        raise ValueError("Not a batch buffer")
+    codelength = buffer[4]
+    growth = option_name(GROWTH_STRATEGIES, buffer[5], 'growth strategy')
+    replacement = option_name(REPLACEMENT_POLICIES, buffer[6], 'replacement policy')
+    count = int.from_bytes(buffer[7:11], byteorder='big')
+    codes_start = 11 + 4 * (count + 1)
+    if codes_start > len(buffer):
+        raise ValueError("Truncated batch buffer")
+    offsets = struct.unpack_from(f'>{count + 1}I', buffer, 11)
+    if codes_start + 2 * offsets[-1] > len(buffer):
+        raise ValueError("Truncated batch buffer")
+    return codelength, growth, replacement, offsets, codes_start
+
+
+def decode_batch(buffer, workers=None):
+    """Restore the list of records (as bytes) of a batch buffer"""
+    codelength, growth, replacement, offsets, codes_start = read_batch_header(buffer)
+    codes = struct.unpack_from(f'>{offsets[-1]}H', buffer, codes_start)
+    code_lists = [list(codes[start:end]) for start, end in zip(offsets[:-1], offsets[1:])]
+    if workers and workers > 1 and len(code_lists) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        shards = split_shards(code_lists, workers)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(partial(decode_shard, codelength=codelength, growth=growth,
+                                       replacement=replacement), shards)
+            return [record for shard in results for record in shard]
+    return decode_shard(code_lists, codelength, growth, replacement)
+
+
+def read_record(buffer, index):
+    """Decode a single record of a batch buffer"""
+    codelength, growth, replacement, offsets, codes_start = read_batch_header(buffer)
+    if not 0 <= index < len(offsets) - 1:
+        raise IndexError(f"Record index out of range: {index}")
+    start, end = offsets[index], offsets[index + 1]
+    codes = list(struct.unpack_from(f'>{end - start}H', buffer, codes_start + 2 * start))
+    return decode_shard([codes], codelength, growth, replacement)[0]
@@ -0,0 +1,60 @@
+import os
+import subprocess
+import sys
+
+# Import-time budget of the headless entry points. Every module is imported in a
+# fresh interpreter (so nothing is cached in sys.modules), the import time is
+# measured there and the heavy modules (NumPy, PIL, tkinter) that got loaded are
+# reported. The best of a few runs is compared with the budget; the script exits
+# with status 1 if a module is over its budget or loads a heavy module it must
+# not load.
+#
+#   python check_import_time.py
+# ------------------------------------------------------------------------------
+# budget in milliseconds (on top of the bare interpreter start-up)
+IMPORT_BUDGETS = {
+    'LZW': 25,
+    'codec_registry': 30,
+    'batch_coding': 30,
+    'lzw_archive': 30,
+    'lzw_cli': 40,
+}
+HEAVY_MODULES = ('numpy', 'PIL', 'tkinter')
+RUNS = 5
+
+MEASURE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(elapsed * 1000, ','.join(heavy))
+"""
+
+
+def measure_import(module, runs=RUNS):
+    """Return (best import time in ms, heavy modules loaded) of a module"""
+    directory = os.path.dirname(os.path.realpath(__file__))
+    best, heavy = None, []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', MEASURE.format(module=module, heavy=HEAVY_MODULES)],
+                                cwd=directory, capture_output=True, text=True, check=True).stdout
+        elapsed, _, loaded = output.strip().partition(' ')
+        best = float(elapsed) if best is None else min(best, float(elapsed))
+        heavy = [name for name in loaded.split(',') if name]
+    return best, heavy
+
+
+def check_budgets(budgets=IMPORT_BUDGETS):
+    ok = True
+    for module, budget in budgets.items():
+        elapsed, heavy = measure_import(module)
+        passed = elapsed <= budget and not heavy
+        ok = ok and passed
+        loaded = f", loads {', '.join(heavy)}" if heavy else ''
+        print(f"{'ok  ' if passed else 'FAIL'} {module}: {elapsed:.1f} ms (budget {budget} ms){loaded}")
+    return ok
+
+
+if __name__ == '__main__':
+    sys.exit(0 if check_budgets() else 1)
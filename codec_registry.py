@@ -0,0 +1,159 @@
+import io
+from importlib import import_module
+from LZW import LZWCoding
+
+# In-memory API for all levels. compress() turns bytes/str (Level 1) or an image
+# (a PIL image or a uint8 array, Levels 2-5) into bytes and decompress() turns
+# them back without touching the filesystem. Every level is a codec in the
+# CODECS registry, so new levels only have to be registered.
+#
+# Layout: b'LZWM', level (1 byte), followed by exactly the bytes the level writes
+# to its .bin/.compressed file.
+#
+# Only the core codec is imported here: NumPy, PIL and the image compressors are
+# imported on first use, so text/bytes compression starts in milliseconds (see
+# check_import_time.py).
+# ------------------------------------------------------------------------------
+MAGIC = b'LZWM'
+CODECS = {}
+
+
+def register_codec(level):
+    """Class decorator registering a codec class for a level number"""
+    def register(cls):
+        CODECS[level] = cls
+        return cls
+    return register
+
+
+def to_image(obj):
+    """Accept a PIL image, a uint8 array (H x W, H x W x 3 or H x W x 4) or a
+    uint16 array (H x W, 16-bit grayscale)"""
+    import numpy as np
+    from PIL import Image
+    if isinstance(obj, Image.Image):
+        return obj
+    array = np.asarray(obj)
+    if array.dtype == np.uint16 and array.ndim == 2:
+        return Image.fromarray(array)
+    if array.dtype != np.uint8 or array.ndim not in (2, 3):
+        raise ValueError("Images must be uint8 arrays of shape (H, W) or (H, W, C)")
+    if array.ndim == 3 and array.shape[2] not in (3, 4):
+        raise ValueError("Colour images must have 3 (RGB) or 4 (RGBA) channels")
+    return Image.fromarray(array)
+
+
+def default_level(obj):
+    """Level 1 for bytes/str, Level 3 for grayscale, Level 5 for colour and
+    Level 6 for 16-bit grayscale images"""
+    if isinstance(obj, (bytes, bytearray, str)):
+        return 1
+    from high_bit_depth_compressor import is_high_bit_depth
+    img = to_image(obj)
+    if is_high_bit_depth(img):
+        return 6
+    return 3 if img.mode == 'L' else 5
+
+
+@register_codec(1)
+class TextCodec:
+    """Level 1: LZW on the bytes (str is utf-8 encoded, decoding returns bytes)"""
+    def __init__(self, codelength=None, entropy_coder='none', effort='fast', growth='lzw',
+                 replacement='freeze'):
+        self.lzw = LZWCoding('memory', 'level1', codelength, entropy_coder, effort, growth,
+                             replacement)
+
+    def encode(self, obj, f):
+        if isinstance(obj, str):
+            obj = obj.encode('utf-8')
+        text = bytes(obj).decode('latin-1')
+        self.lzw.write_codes(f, self.lzw.encode(text) if text else [])
+
+    def decode(self, f):
+        encoded_values = self.lzw.read_codes(f)
+        return self.lzw.decode_codes(encoded_values).encode('latin-1') if encoded_values else b''
+
+
+class ImageCodec:
+    """Image levels: wraps the compressor class without an image path
+
+    The compressor is given as (module name, class name) and imported when the
+    codec is first used.
+    """
+    compressor_path = None
+
+    def __init__(self, **options):
+        module_name, class_name = self.compressor_path
+        compressor_class = getattr(import_module(module_name), class_name)
+        self.compressor = compressor_class(None, **options)
+
+    def encode(self, obj, f):
+        self.compressor.compress_image(to_image(obj), f)
+
+    def decode(self, f):
+        return self.compressor.decompress_stream(f)
+
+
+@register_codec(2)
+class Level2Codec(ImageCodec):
+    compressor_path = ('image_compressor', 'ImageCompressor')
+
+
+@register_codec(3)
+class Level3Codec(ImageCodec):
+    compressor_path = ('level3_compressor', 'Level3Compressor')
+
+
+@register_codec(4)
+class Level4Codec(ImageCodec):
+    compressor_path = ('level4_compressor', 'Level4Compressor')
+
+
+@register_codec(5)
+class Level5Codec(ImageCodec):
+    compressor_path = ('level5_compressor', 'Level5Compressor')
+
+
+@register_codec(6)
+class HighBitDepthCodec(ImageCodec):
+    compressor_path = ('high_bit_depth_compressor', 'HighBitDepthCompressor')
+
+
+def compress(obj, level=None, **options):
+    """Compress bytes/str or an image in memory and return the bytes
+
+    The options are passed to the level (e.g. codelength, entropy_coder,
+    color_transform, near, run_length, scan_order, effort, growth,
+    replacement).
+    """
+    if level is None:
+        level = default_level(obj)
+    if level not in CODECS:
+        raise ValueError(f"Unknown level: {level}")
+    if level == 1 and not isinstance(obj, (bytes, bytearray, str)):
+        raise ValueError("Level 1 compresses bytes or str")
+    f = io.BytesIO()
+    f.write(MAGIC)
+    f.write(level.to_bytes(1, byteorder='big'))
+    CODECS[level](**options).encode(obj, f)
+    return f.getvalue()
+
+
+def decompress(data, as_image=False):
+    """Restore the output of compress()
+
+    Level 1 returns bytes, the image levels return a uint8 array (uint16 for
+    Level 6) or the PIL image with as_image=True, which keeps the palette of
+    palette images.
+    """
+    f = io.BytesIO(data)
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError("Not compressed with codec_registry.compress")
+    level = int.from_bytes(f.read(1), byteorder='big')
+    if level not in CODECS:
+        raise ValueError(f"Unknown level: {level}")
+    restored = CODECS[level]().decode(f)
+    if level == 1 or as_image:
+        return restored
+    import numpy as np
+    return np.array(restored)
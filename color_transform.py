@@ -0,0 +1,61 @@
+import numpy as np
+
+# Reversible integer colour transforms used by the colour levels (Level 4 and 5)
+# before the channels are encoded. Every transform maps three uint8 planes to
+# three uint8 planes and is exactly invertible, so compression stays lossless.
+# The lifting steps are done modulo 256, which keeps the chroma planes inside the
+# 8-bit alphabet the LZW coders expect.
+# ------------------------------------------------------------------------------
+COLOR_TRANSFORMS = {'none': 0, 'ycocg-r': 1, 'g-relative': 2}
+
+
+def _signed(plane):
+    """Interpret a wrapped uint8 plane as signed values in [-128, 127]"""
+    return plane.astype(np.int8).astype(np.int16)
+
+
+def _wrap(values):
+    """Reduce int16 values modulo 256 back to uint8"""
+    return (values & 0xFF).astype(np.uint8)
+
+
+def forward_color_transform(r, g, b, transform):
+    """Apply the named transform to the R, G, B planes"""
+    if transform == 'none':
+        return r, g, b
+    r16, g16, b16 = (np.asarray(x, dtype=np.int16) for x in (r, g, b))
+    if transform == 'ycocg-r':
+        co = _wrap(r16 - b16)
+        t = _wrap(b16 + (_signed(co) >> 1))
+        cg = _wrap(g16 - t)
+        y = _wrap(t + (_signed(cg) >> 1))
+        return y, co, cg
+    if transform == 'g-relative':
+        return _wrap(r16 - g16), _wrap(g16), _wrap(b16 - g16)
+    raise ValueError(f"Unknown colour transform: {transform}")
+
+
+def inverse_color_transform(c0, c1, c2, transform):
+    """Undo forward_color_transform and return the R, G, B planes"""
+    if transform == 'none':
+        return c0, c1, c2
+    a, b_, c = (np.asarray(x, dtype=np.int16) for x in (c0, c1, c2))
+    if transform == 'ycocg-r':
+        y, co, cg = a, b_, c
+        t = _wrap(y - (_signed(cg) >> 1))
+        g = _wrap(cg + t)
+        b = _wrap(t - (_signed(co) >> 1))
+        r = _wrap(b + co)
+        return r, g, b
+    if transform == 'g-relative':
+        g = _wrap(b_)
+        return _wrap(a + b_), g, _wrap(c + b_)
+    raise ValueError(f"Unknown colour transform: {transform}")
+
+
+def transform_name(code):
+    """Map a header byte back to the transform name"""
+    for name, value in COLOR_TRANSFORMS.items():
+        if value == code:
+            return name
+    raise ValueError(f"Unknown colour transform code: {code}")
@@ -0,0 +1,350 @@
+import asyncio
+import functools
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import codec_registry
+
+# Local compression service. An asyncio server (TCP on localhost or a Unix
+# socket) accepts compress/decompress jobs for every level of codec_registry and
+# runs them on a process pool, so other processes on the host do not have to
+# start an interpreter per file.
+#
+# Every message is a frame: frame length (4 bytes), metadata length (4 bytes),
+# the metadata as utf-8 JSON and the body (raw bytes). A request holds the job
+# id, the operation ('compress', 'decompress' or 'stats') and the options of the
+# level in its metadata; images are sent as the raw pixels with their "shape"
+# and "dtype" (uint8, or uint16 for 16-bit grayscale). A response holds the id, "ok", "error" or the result metadata and the
+# latency of the job (time waiting in the server and time spent in the pool).
+#
+# Backpressure: at most max_pending jobs are accepted at a time, a connection is
+# not read any further while its last request waits for a free slot (idle
+# connections hold no slot). Batching: jobs waiting for the pool are sent to a
+# worker in batches of up to batch_size jobs (after at most batch_delay
+# seconds), which saves the inter-process overhead of tiny jobs.
+# ------------------------------------------------------------------------------
+MAX_FRAME_SIZE = 1 << 30
+# number of recent job latencies kept for the percentiles of the stats
+LATENCY_WINDOW = 1024
+
+
+async def read_frame(reader):
+    """Read one frame and return (metadata, body), None at the end of the stream"""
+    try:
+        header = await reader.readexactly(8)
+    except asyncio.IncompleteReadError:
+        return None
+    frame_length = int.from_bytes(header[:4], byteorder='big')
+    meta_length = int.from_bytes(header[4:], byteorder='big')
+    if frame_length > MAX_FRAME_SIZE or meta_length > frame_length:
+        raise ValueError(f"Invalid frame of {frame_length} bytes")
+    data = await reader.readexactly(frame_length)
+    return json.loads(data[:meta_length].decode('utf-8')), data[meta_length:]
+
+
+def encode_frame(meta, body=b''):
+    meta = json.dumps(meta).encode('utf-8')
+    return ((len(meta) + len(body)).to_bytes(4, byteorder='big') +
+            len(meta).to_bytes(4, byteorder='big') + meta + body)
+
+
+def run_job(op, options, body):
+    """Run one job in a worker process and return (metadata, body)"""
+    options = dict(options)
+    if op == 'compress':
+        shape = options.pop('shape', None)
+        dtype = np.dtype(options.pop('dtype', 'uint8'))
+        if dtype not in (np.uint8, np.uint16):
+            raise ValueError(f"Unsupported image dtype: {dtype}")
+        obj = np.frombuffer(body, dtype=dtype).reshape(shape) if shape else body
+        return {}, codec_registry.compress(obj, **options)
+    if op == 'decompress':
+        restored = codec_registry.decompress(body)
+        if isinstance(restored, np.ndarray):
+            return {'shape': list(restored.shape), 'dtype': restored.dtype.name}, restored.tobytes()
+        return {}, restored
+    raise ValueError(f"Unknown operation: {op}")
+
+
+def run_batch(jobs):
+    """Run a batch of (op, options, body) jobs"""
+    results = []
+    for op, options, body in jobs:
+        start = time.perf_counter()
+        try:
+            meta, result = run_job(op, options, body)
+            meta['ok'] = True
+        except Exception as e:
+            meta, result = {'ok': False, 'error': str(e)}, b''
+        meta['service_time'] = time.perf_counter() - start
+        results.append((meta, result))
+    return results
+
+
+class CompressionServer:
+    def __init__(self, host='127.0.0.1', port=0, path=None, max_workers=None,
+                 max_pending=64, batch_size=8, batch_delay=0.002):
+        if max_pending < 1 or batch_size < 1:
+            raise ValueError("max_pending and batch_size must be at least 1")
+        self.host = host
+        self.port = port
+        self.path = path  # Unix socket path (instead of host/port)
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.pool = None
+        self.server = None
+        self.jobs = None
+        self.slots = None
+        self.batcher = None
+        self.running = set()
+        self.connections = {}  # handler task -> stream writer
+        self.pending = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.completed = 0
+        self.failed = 0
+        self.batches = 0
+
+    async def start(self):
+        self.pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        self.jobs = asyncio.Queue()
+        self.slots = asyncio.Semaphore(self.max_pending)
+        self.batcher = asyncio.create_task(self.dispatch_batches())
+        if self.path:
+            self.server = await asyncio.start_unix_server(self.handle_connection, self.path)
+            print(f"Compression service listening on {self.path}")
+        else:
+            self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+            self.port = self.server.sockets[0].getsockname()[1]
+            print(f"Compression service listening on {self.host}:{self.port}")
+        return self
+
+    async def close(self):
+        self.server.close()
+        # closing the transports ends the reading loops of open connections
+        for writer in self.connections.values():
+            writer.close()
+        if self.connections:
+            await asyncio.gather(*self.connections, return_exceptions=True)
+        await self.server.wait_closed()
+        self.batcher.cancel()
+        # waiting for the workers blocks, so it runs outside the event loop
+        await asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(self.pool.shutdown, wait=True, cancel_futures=True))
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.close()
+
+    async def handle_connection(self, reader, writer):
+        lock = asyncio.Lock()
+        tasks = set()
+        handler = asyncio.current_task()
+        self.connections[handler] = writer
+
+        async def respond(meta, body=b''):
+            async with lock:
+                writer.write(encode_frame(meta, body))
+                await writer.drain()
+
+        async def run(meta, body):
+            self.pending += 1
+            try:
+                result_meta, result = await self.submit(meta.get('op'), meta.get('options', {}), body)
+                result_meta['id'] = meta.get('id')
+                await respond(result_meta, result)
+            finally:
+                self.pending -= 1
+                self.slots.release()
+
+        try:
+            while True:
+                frame = await read_frame(reader)
+                if frame is None:
+                    break
+                meta, body = frame
+                if meta.get('op') == 'stats':
+                    await respond(dict(self.stats(), id=meta.get('id'), ok=True))
+                    continue
+                # backpressure: do not read the next request before a slot is
+                # free (an idle connection holds no slot); run releases it
+                await self.slots.acquire()
+                try:
+                    task = asyncio.create_task(run(meta, body))
+                except BaseException:
+                    self.slots.release()
+                    raise
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError) as e:
+            print(f"Compression service connection error: {str(e)}")
+        finally:
+            del self.connections[handler]
+            writer.close()
+
+    async def submit(self, op, options, body):
+        """Queue a job for the next batch and wait for its result"""
+        future = asyncio.get_running_loop().create_future()
+        await self.jobs.put((time.perf_counter(), (op, options, body), future))
+        return await future
+
+    async def dispatch_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.jobs.get()]
+            deadline = loop.time() + self.batch_delay
+            while len(batch) < self.batch_size:
+                if not self.jobs.empty():
+                    batch.append(self.jobs.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.jobs.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self.batches += 1
+            # the batch runs in the pool while the next one is collected
+            task = asyncio.create_task(self.run_pool_batch(batch))
+            self.running.add(task)
+            task.add_done_callback(self.running.discard)
+
+    async def run_pool_batch(self, batch):
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self.pool, run_batch, [job for _, job, _ in batch])
+        except Exception as e:
+            results = [({'ok': False, 'error': str(e), 'service_time': 0.0}, b'')] * len(batch)
+        for (submitted, _, future), (meta, body) in zip(batch, results):
+            meta['latency'] = time.perf_counter() - submitted
+            meta['queue_time'] = meta['latency'] - meta['service_time']
+            self.latencies.append(meta['latency'])
+            if meta['ok']:
+                self.completed += 1
+            else:
+                self.failed += 1
+            if not future.done():
+                future.set_result((meta, body))
+
+    def stats(self):
+        """Job counters and latency percentiles (seconds) of the recent jobs"""
+        latencies = np.array(self.latencies) if self.latencies else np.zeros(1)
+        return {
+            'completed': self.completed,
+            'failed': self.failed,
+            'batches': self.batches,
+            'pending': self.pending,
+            'latency_mean': float(latencies.mean()),
+            'latency_p50': float(np.percentile(latencies, 50)),
+            'latency_p95': float(np.percentile(latencies, 95)),
+            'latency_max': float(latencies.max()),
+        }
+
+
+class CompressionError(Exception):
+    pass
+
+
+class CompressionClient:
+    """Async client, several requests can be in flight on one connection"""
+    def __init__(self):
+        self.reader = None
+        self.writer = None
+        self.futures = {}
+        self.next_id = 0
+        self.receiver = None
+        # latency metadata of the last response
+        self.last_metrics = None
+
+    async def connect(self, host='127.0.0.1', port=None, path=None):
+        if path:
+            self.reader, self.writer = await asyncio.open_unix_connection(path)
+        else:
+            self.reader, self.writer = await asyncio.open_connection(host, port)
+        self.receiver = asyncio.create_task(self.receive())
+        return self
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+        self.receiver.cancel()
+
+    async def receive(self):
+        try:
+            while True:
+                frame = await read_frame(self.reader)
+                if frame is None:
+                    break
+                meta, body = frame
+                future = self.futures.pop(meta.get('id'), None)
+                if future is not None and not future.done():
+                    future.set_result((meta, body))
+        finally:
+            for future in self.futures.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Connection closed"))
+
+    async def request(self, op, options=None, body=b''):
+        self.next_id += 1
+        job_id = self.next_id
+        future = asyncio.get_running_loop().create_future()
+        self.futures[job_id] = future
+        self.writer.write(encode_frame({'id': job_id, 'op': op, 'options': options or {}}, body))
+        await self.writer.drain()
+        meta, body = await future
+        if not meta.get('ok'):
+            raise CompressionError(meta.get('error'))
+        self.last_metrics = {key: meta[key] for key in ('latency', 'queue_time', 'service_time')
+                             if key in meta}
+        return meta, body
+
+    async def compress(self, obj, level=None, **options):
+        """Compress bytes/str or a uint8/uint16 image array on the server"""
+        if isinstance(obj, str):
+            obj = obj.encode('utf-8')
+        if isinstance(obj, np.ndarray):
+            # like codec_registry.to_image, other dtypes are not cast (values would wrap)
+            if obj.dtype not in (np.uint8, np.uint16):
+                raise ValueError("Images must be uint8 or uint16 arrays")
+            options['shape'] = list(obj.shape)
+            options['dtype'] = obj.dtype.name
+            obj = np.ascontiguousarray(obj).tobytes()
+        if level is not None:
+            options['level'] = level
+        _, body = await self.request('compress', options, bytes(obj))
+        return body
+
+    async def decompress(self, data):
+        """Return bytes (Level 1) or a uint8/uint16 array (image levels)"""
+        meta, body = await self.request('decompress', {}, bytes(data))
+        if 'shape' in meta:
+            dtype = np.dtype(meta.get('dtype', 'uint8'))
+            return np.frombuffer(body, dtype=dtype).reshape(meta['shape'])
+        return body
+
+    async def stats(self):
+        meta, _ = await self.request('stats')
+        return meta
+
+
+if __name__ == '__main__':
+    # python compression_service.py [port | unix socket path]
+    argument = sys.argv[1] if len(sys.argv) > 1 else '8765'
+    if argument.isdigit():
+        service = CompressionServer(port=int(argument))
+    else:
+        service = CompressionServer(path=argument)
+    asyncio.run(service.serve_forever())
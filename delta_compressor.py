@@ -0,0 +1,205 @@
+import hashlib
+import numpy as np
+from PIL import Image
+import os
+from LZW import LZWCoding
+from entropy_coding import ENTROPY_CODERS, write_huffman_blob, read_huffman_blob
+from run_length import RUN_LENGTH_MODES, resolve_run_length, rle_encode, rle_decode
+from pipeline import pack_codes
+from scan_order import SCAN_ORDERS, scan_order_name, scan, unscan
+from image_modes import PLANE_NAMES, split_planes, merge_planes, write_mode_info, read_mode_info
+from high_bit_depth_compressor import is_high_bit_depth
+
+# Delta compression of an image against a reference image (e.g. the previous
+# revision of the same image). Every plane is stored as the residual
+# (target - reference) mod 256, which is zero wherever the revisions agree, so
+# the LZW codes (after the run-length pre-pass) only grow with the change.
+#
+# The header carries the SHA-256 content hash of the reference (mode, size,
+# pixels and palette), decompression refuses a reference with another hash.
+# ------------------------------------------------------------------------------
+HASH_SIZE = 32
+# width, height, code length, entropy coder, run-length and scan order bytes
+HASH_OFFSET = 12
+
+
+def content_hash(img):
+    """SHA-256 of the pixels of an image (independent of its file format)"""
+    digest = hashlib.sha256(f"{img.mode} {img.width}x{img.height}".encode('ascii'))
+    digest.update(img.tobytes())
+    if img.mode == 'P':
+        digest.update(bytes(img.getpalette() or []))
+    return digest.digest()
+
+
+def reference_planes(reference, mode, size):
+    """The planes of the reference in the storage mode of the target"""
+    if is_high_bit_depth(reference):
+        raise ValueError("16-bit reference images would be truncated")
+    if reference.size != size:
+        raise ValueError(f"Reference size {reference.size} differs from the image size {size}")
+    if mode == 'P':
+        if reference.mode != 'P':
+            raise ValueError("A palette image needs a palette reference image")
+        return [np.array(reference, dtype=np.uint8)]
+    if reference.mode != mode:
+        reference = reference.convert(mode)
+    return split_planes(reference, allow_grayscale=True)[1]
+
+
+def stored_reference_hash(compressed_file_path):
+    """The reference hash in the header of a .delta.compressed file"""
+    with open(compressed_file_path, 'rb') as f:
+        f.seek(HASH_OFFSET)
+        return f.read(HASH_SIZE)
+
+
+class DeltaCompressor:
+    def __init__(self, image_path=None, reference_path=None, codelength=None, entropy_coder='none', run_length='auto', scan_order='row', effort='fast'):
+        if entropy_coder not in ENTROPY_CODERS:
+            raise ValueError(f"Unknown entropy coder: {entropy_coder}")
+        self.image_path = image_path
+        self.reference_path = reference_path
+        self.entropy_coder = entropy_coder
+        # residuals are mostly zero, so the run-length pre-pass usually pays off
+        if run_length not in RUN_LENGTH_MODES:
+            raise ValueError(f"Unknown run-length mode: {run_length}")
+        self.run_length = run_length
+        if scan_order not in SCAN_ORDERS:
+            raise ValueError(f"Unknown scan order: {scan_order}")
+        self.scan_order = scan_order
+        # one LZW coder per plane (alpha is optional)
+        base_name = os.path.splitext(image_path)[0] if image_path else 'image'
+        self.coders = [LZWCoding(base_name, 'level4', codelength, effort=effort) for _ in range(4)]
+        self.original_size = os.path.getsize(image_path) if image_path else None
+        self.width = None
+        self.height = None
+        self.mode = None
+        self.changed_pixels = None
+        self.compression_ratio = None
+
+    def compress(self):
+        print(f"Delta - Compressing {self.image_path} against {self.reference_path}")
+        try:
+            img = Image.open(self.image_path)
+            reference = Image.open(self.reference_path)
+            output_path = f"{self.image_path}.delta.compressed"
+            with open(output_path, 'wb') as f:
+                self.compress_image(img, reference, f)
+            print(f"Image dimensions: {self.width}x{self.height}, storage mode: {self.mode}")
+            
+            # Calculate compression statistics
+            compressed_size = os.path.getsize(output_path)
+            self.compression_ratio = self.original_size / compressed_size
+            
+            print(f"\nDelta Compression Statistics:")
+            print(f"Changed Pixels: {self.changed_pixels:,} of {self.width * self.height:,}")
+            print(f"Original Size: {self.original_size:,} bytes")
+            print(f"Compressed Size: {compressed_size:,} bytes")
+            print(f"Compression Ratio: {self.compression_ratio:.2f}")
+            
+            return True
+        
+        except Exception as e:
+            print(f"Error during delta compression: {str(e)}")
+            raise e
+
+    def compress_image(self, img, reference, f):
+        """Compress a PIL image against a reference PIL image into an open binary file"""
+        if is_high_bit_depth(img):
+            raise ValueError("16-bit images would be truncated, use HighBitDepthCompressor")
+        self.width, self.height = img.size
+        
+        # Residual planes (uint8 arithmetic wraps around modulo 256)
+        self.mode, planes, palette = split_planes(img, allow_grayscale=True)
+        residuals = [plane - base for plane, base in
+                     zip(planes, reference_planes(reference, self.mode, img.size))]
+        self.changed_pixels = int(np.any(np.stack(residuals), axis=0).sum())
+        
+        # Optional run-length pre-pass for the (mostly zero) residuals
+        symbol_planes = [scan(residual, self.scan_order) for residual in residuals]
+        use_rle = resolve_run_length(self.run_length, symbol_planes, self.coders[0])
+        if use_rle:
+            symbol_planes = [rle_encode(symbols) for symbols in symbol_planes]
+        
+        encoded_planes = []
+        for symbols, lzw in zip(symbol_planes, self.coders):
+            encoded_planes.append(lzw.encode(''.join([chr(x) for x in symbols])))
+        
+        # Write metadata and the hash of the reference
+        f.write(self.width.to_bytes(4, byteorder='big'))
+        f.write(self.height.to_bytes(4, byteorder='big'))
+        f.write(self.coders[0].codelength.to_bytes(1, byteorder='big'))
+        f.write(ENTROPY_CODERS[self.entropy_coder].to_bytes(1, byteorder='big'))
+        f.write(int(use_rle).to_bytes(1, byteorder='big'))
+        f.write(SCAN_ORDERS[self.scan_order].to_bytes(1, byteorder='big'))
+        f.write(content_hash(reference))
+        write_mode_info(f, self.mode, palette)
+        for encoded_data in encoded_planes:
+            f.write(len(encoded_data).to_bytes(4, byteorder='big'))
+        
+        # Write encoded data for each plane (one Huffman table for all planes)
+        if self.entropy_coder == 'huffman':
+            write_huffman_blob(f, [value for encoded_data in encoded_planes
+                                   for value in encoded_data])
+        else:
+            for encoded_data in encoded_planes:
+                f.write(pack_codes(encoded_data))
+        
+        return encoded_planes
+
+    def decompress(self, compressed_file_path, reference_path=None):
+        try:
+            print(f"Delta - Decompressing file: {compressed_file_path}")
+            reference = Image.open(reference_path or self.reference_path)
+            
+            with open(compressed_file_path, 'rb') as f:
+                restored_image = self.decompress_stream(f, reference)
+            
+            # Save restored image
+            output_path = compressed_file_path.replace('.delta.compressed', '_delta_restored.bmp')
+            restored_image.save(output_path, format='BMP')
+            print(f"Restored image saved: {output_path}")
+            
+            return restored_image
+        
+        except Exception as e:
+            print(f"Error during delta decompression: {str(e)}")
+            raise e
+
+    def decompress_stream(self, f, reference):
+        """Read a delta compressed image from an open binary file and restore it"""
+        # Read metadata
+        self.width = int.from_bytes(f.read(4), byteorder='big')
+        self.height = int.from_bytes(f.read(4), byteorder='big')
+        codelength = int.from_bytes(f.read(1), byteorder='big')
+        for lzw in self.coders:
+            lzw.set_codelength(codelength)
+        entropy_coder = int.from_bytes(f.read(1), byteorder='big')
+        use_rle = int.from_bytes(f.read(1), byteorder='big')
+        scan_order = scan_order_name(int.from_bytes(f.read(1), byteorder='big'))
+        if f.read(HASH_SIZE) != content_hash(reference):
+            raise ValueError("The reference image does not match the one used for compression")
+        self.mode, palette = read_mode_info(f)
+        plane_count = len(PLANE_NAMES[self.mode])
+        lengths = [int.from_bytes(f.read(4), byteorder='big') for _ in range(plane_count)]
+        
+        if entropy_coder == ENTROPY_CODERS['huffman']:
+            values = read_huffman_blob(f)
+            offsets = np.cumsum([0] + lengths)
+            encoded_planes = [values[offsets[i]:offsets[i + 1]] for i in range(plane_count)]
+        else:
+            encoded_planes = [np.frombuffer(f.read(2 * length), dtype='>u2').tolist()
+                              for length in lengths]
+        
+        # Decode the residuals and add the reference back (modulo 256)
+        planes = []
+        base_planes = reference_planes(reference, self.mode, (self.width, self.height))
+        for encoded_values, lzw, base in zip(encoded_planes, self.coders, base_planes):
+            symbols = [ord(c) for c in lzw.decode_codes(encoded_values)]
+            if use_rle:
+                symbols = rle_decode(symbols)
+            residual = unscan(np.array(symbols, dtype=np.uint8), (self.height, self.width), scan_order)
+            planes.append(residual + base)
+        
+        return merge_planes(self.mode, planes, palette)
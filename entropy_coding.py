@@ -0,0 +1,128 @@
+import heapq
+
+# Optional second stage for the LZW code streams. The output codes of the LZW
+# coders are far from uniform (small and recently added codes are much more
+# frequent), so they are entropy coded with a canonical Huffman code instead of
+# being written with a flat number of bits. The code lengths table is stored in
+# front of the packed bits, which makes every blob self-contained.
+#
+# Blob layout: value count (4 bytes), table size n (4 bytes), n code lengths
+# (1 byte each, 0 for unused codes), the Huffman coded bits padded to a byte.
+# ------------------------------------------------------------------------------
+ENTROPY_CODERS = {'none': 0, 'huffman': 1}
+
+
+def huffman_code_lengths(values):
+    """Return a list with the Huffman code length of every value 0..max(values)"""
+    frequencies = {}
+    for value in values:
+        frequencies[value] = frequencies.get(value, 0) + 1
+    lengths = [0] * (max(frequencies) + 1)
+    if len(frequencies) == 1:
+        lengths[next(iter(frequencies))] = 1
+        return lengths
+
+    # each heap item holds (frequency, tie breaker, symbols in the subtree)
+    heap = [(frequency, symbol, [symbol]) for symbol, frequency in frequencies.items()]
+    heapq.heapify(heap)
+    counter = len(lengths)
+    while len(heap) > 1:
+        f1, _, symbols1 = heapq.heappop(heap)
+        f2, _, symbols2 = heapq.heappop(heap)
+        for symbol in symbols1:
+            lengths[symbol] += 1
+        for symbol in symbols2:
+            lengths[symbol] += 1
+        heapq.heappush(heap, (f1 + f2, counter, symbols1 + symbols2))
+        counter += 1
+    return lengths
+
+
+def canonical_codes(lengths):
+    """Assign canonical Huffman codes from the code lengths"""
+    codes = {}
+    code = 0
+    previous_length = 0
+    for length, symbol in sorted((length, symbol) for symbol, length in enumerate(lengths) if length):
+        code <<= length - previous_length
+        codes[symbol] = (code, length)
+        code += 1
+        previous_length = length
+    return codes
+
+
+def huffman_encode(values):
+    """Entropy code a list of LZW output codes and return the blob"""
+    lengths = huffman_code_lengths(values) if values else []
+    if any(length > 255 for length in lengths):
+        raise ValueError("Huffman code length does not fit in the table")
+    codes = canonical_codes(lengths)
+    bits = ''.join(format(code, f'0{length}b') for code, length in (codes[v] for v in values))
+    padding = -len(bits) % 8
+    bits += '0' * padding
+    data = int(bits, 2).to_bytes(len(bits) // 8, byteorder='big') if bits else b''
+
+    blob = bytearray()
+    blob += len(values).to_bytes(4, byteorder='big')
+    blob += len(lengths).to_bytes(4, byteorder='big')
+    blob += bytes(lengths)
+    blob += data
+    return bytes(blob)
+
+
+def huffman_decode(blob):
+    """Decode a blob written by huffman_encode and return the list of codes"""
+    count = int.from_bytes(blob[0:4], byteorder='big')
+    table_size = int.from_bytes(blob[4:8], byteorder='big')
+    lengths = list(blob[8:8 + table_size])
+    data = blob[8 + table_size:]
+    if count == 0:
+        return []
+
+    # canonical decoding tables: first code, symbol count and offset per length
+    symbols = [symbol for length, symbol in
+               sorted((length, symbol) for symbol, length in enumerate(lengths) if length)]
+    max_length = max(lengths)
+    length_counts = [0] * (max_length + 1)
+    for length in lengths:
+        if length:
+            length_counts[length] += 1
+    first_code = [0] * (max_length + 1)
+    first_index = [0] * (max_length + 1)
+    code = 0
+    index = 0
+    for length in range(1, max_length + 1):
+        code <<= 1
+        first_code[length] = code
+        first_index[length] = index
+        code += length_counts[length]
+        index += length_counts[length]
+
+    bits = bin(int.from_bytes(data, byteorder='big'))[2:].zfill(len(data) * 8)
+    result = []
+    code = 0
+    length = 0
+    for bit in bits:
+        code = (code << 1) | (bit == '1')
+        length += 1
+        offset = code - first_code[length]
+        if offset < length_counts[length]:
+            result.append(symbols[first_index[length] + offset])
+            if len(result) == count:
+                break
+            code = 0
+            length = 0
+    return result
+
+
+def write_huffman_blob(f, values):
+    """Write a length prefixed Huffman blob to an open binary file"""
+    blob = huffman_encode(values)
+    f.write(len(blob).to_bytes(4, byteorder='big'))
+    f.write(blob)
+
+
+def read_huffman_blob(f):
+    """Read a blob written by write_huffman_blob and return the decoded codes"""
+    blob_length = int.from_bytes(f.read(4), byteorder='big')
+    return huffman_decode(f.read(blob_length))
@@ -0,0 +1,204 @@
+import numpy as np
+from PIL import Image
+import os
+from LZW import LZWCoding
+from entropy_coding import ENTROPY_CODERS, write_huffman_blob, read_huffman_blob
+from run_length import RUN_LENGTH_MODES, resolve_run_length, rle_encode, rle_decode
+from pipeline import pack_codes
+from scan_order import SCAN_ORDERS, scan_order_name, scan, unscan
+
+# Lossless compression of 16-bit grayscale images (PIL modes I;16, I;16L,
+# I;16B and I with values up to 65535, e.g. medical and scientific scans),
+# which Levels 2 and 3 would truncate to 8 bits. The 16-bit samples are split
+# into a high and a low byte plane, so both planes are coded with the 8-bit
+# alphabet (one level4 type LZW coder per plane).
+#
+# With differencing (the default) the planes hold the Level 3 differences
+# (left neighbour, above for the first column) computed in int32 and wrapped
+# to 16 bits, zigzag mapped (0, -1, 1, -2, ... -> 0, 1, 2, 3, ...) so that
+# small differences have a zero high byte. Without differencing the planes
+# hold the pixel bytes (like Level 2).
+#
+# Header: width, height (4 bytes each), code length, entropy coder,
+# differencing, run-length and scan order (1 byte each), the number of codes
+# of the high and the low plane (4 bytes each).
+# ------------------------------------------------------------------------------
+HIGH_BIT_DEPTH_MODES = ('I;16', 'I;16L', 'I;16B', 'I')
+# size of the header described above
+HEADER_SIZE = 21
+
+
+def is_high_bit_depth(img):
+    return img.mode in HIGH_BIT_DEPTH_MODES
+
+
+def sample_array(img):
+    """The pixels of a 16-bit grayscale image as a uint16 array"""
+    if not is_high_bit_depth(img):
+        raise ValueError(f"Not a 16-bit grayscale image (mode {img.mode})")
+    samples = np.array(img)
+    if samples.dtype != np.uint16:
+        if samples.size and (samples.min() < 0 or samples.max() > 0xFFFF):
+            raise ValueError("Only 16-bit samples (0-65535) are supported")
+        samples = samples.astype(np.uint16)
+    return samples
+
+
+def wrapped_differences(samples):
+    """Zigzag mapped differences of a uint16 array (first pixel raw), as uint16"""
+    samples = samples.astype(np.int32)
+    diffs = samples.copy()
+    diffs[:, 1:] = samples[:, 1:] - samples[:, :-1]
+    diffs[1:, 0] = samples[1:, 0] - samples[:-1, 0]
+    # wrap to [-32768, 32767] (exact modulo 65536) and zigzag map
+    diffs = ((diffs + 0x8000) & 0xFFFF) - 0x8000
+    return ((diffs << 1) ^ (diffs >> 15)).astype(np.uint16)
+
+
+def restore_differences(mapped):
+    """Undo wrapped_differences"""
+    mapped = mapped.astype(np.int32)
+    diffs = (mapped >> 1) ^ -(mapped & 1)
+    # the first column restores the rows, every row is a running sum
+    diffs[:, 0] = np.cumsum(diffs[:, 0], dtype=np.int64) & 0xFFFF
+    return (np.cumsum(diffs, axis=1, dtype=np.int64) & 0xFFFF).astype(np.uint16)
+
+
+class HighBitDepthCompressor:
+    def __init__(self, image_path=None, codelength=None, entropy_coder='none', differencing=True, run_length='off', scan_order='row', effort='fast'):
+        if entropy_coder not in ENTROPY_CODERS:
+            raise ValueError(f"Unknown entropy coder: {entropy_coder}")
+        self.image_path = image_path
+        self.entropy_coder = entropy_coder
+        self.differencing = differencing
+        if run_length not in RUN_LENGTH_MODES:
+            raise ValueError(f"Unknown run-length mode: {run_length}")
+        self.run_length = run_length
+        if scan_order not in SCAN_ORDERS:
+            raise ValueError(f"Unknown scan order: {scan_order}")
+        self.scan_order = scan_order
+        # one LZW coder for the high and one for the low byte plane
+        # image_path is None for in-memory use (compress_image/decompress_stream)
+        base_name = os.path.splitext(image_path)[0] if image_path else 'image'
+        self.coders = [LZWCoding(base_name, 'level4', codelength, effort=effort) for _ in range(2)]
+        self.original_size = os.path.getsize(image_path) if image_path else None
+        self.width = None
+        self.height = None
+        self.compression_ratio = None
+
+    def compress(self):
+        print(f"16-bit - Compressing image: {self.image_path}")
+        try:
+            img = Image.open(self.image_path)
+            output_path = f"{self.image_path}.hbd.compressed"
+            with open(output_path, 'wb') as f:
+                self.compress_image(img, f)
+            print(f"Image dimensions: {self.width}x{self.height}")
+        
+            # Calculate compression statistics
+            compressed_size = os.path.getsize(output_path)
+            self.compression_ratio = self.original_size / compressed_size
+        
+            print(f"Compressed file saved: {output_path}")
+            print(f"\n16-bit Compression Statistics:")
+            print(f"Original Size: {self.original_size:,} bytes")
+            print(f"Compressed Size: {compressed_size:,} bytes")
+            print(f"Compression Ratio: {self.compression_ratio:.2f}")
+        
+            return True
+        
+        except Exception as e:
+            print(f"Error during 16-bit compression: {str(e)}")
+            raise e
+
+    def compress_image(self, img, f):
+        """Compress a 16-bit grayscale PIL image into an open binary file"""
+        samples = sample_array(img)
+        self.width, self.height = img.size
+        
+        # Split the (mapped) samples into the high and the low byte plane
+        values = wrapped_differences(samples) if self.differencing else samples
+        symbol_planes = [scan((values >> 8).astype(np.uint8), self.scan_order),
+                         scan((values & 0xFF).astype(np.uint8), self.scan_order)]
+        
+        # Optional run-length pre-pass (the high plane is mostly zero)
+        use_rle = resolve_run_length(self.run_length, symbol_planes, self.coders[0])
+        if use_rle:
+            symbol_planes = [rle_encode(symbols) for symbols in symbol_planes]
+        
+        encoded_planes = []
+        for symbols, lzw in zip(symbol_planes, self.coders):
+            encoded_planes.append(lzw.encode(''.join([chr(x) for x in symbols])))
+        
+        # Write metadata
+        f.write(self.width.to_bytes(4, byteorder='big'))
+        f.write(self.height.to_bytes(4, byteorder='big'))
+        f.write(self.coders[0].codelength.to_bytes(1, byteorder='big'))
+        f.write(ENTROPY_CODERS[self.entropy_coder].to_bytes(1, byteorder='big'))
+        f.write(int(self.differencing).to_bytes(1, byteorder='big'))
+        f.write(int(use_rle).to_bytes(1, byteorder='big'))
+        f.write(SCAN_ORDERS[self.scan_order].to_bytes(1, byteorder='big'))
+        for encoded_data in encoded_planes:
+            f.write(len(encoded_data).to_bytes(4, byteorder='big'))
+        
+        # Write encoded data for both planes (one Huffman table for both)
+        if self.entropy_coder == 'huffman':
+            write_huffman_blob(f, [value for encoded_data in encoded_planes
+                                   for value in encoded_data])
+        else:
+            for encoded_data in encoded_planes:
+                f.write(pack_codes(encoded_data))
+        
+        return encoded_planes
+
+    def decompress(self, compressed_file_path):
+        try:
+            print(f"16-bit - Decompressing file: {compressed_file_path}")
+        
+            with open(compressed_file_path, 'rb') as f:
+                restored_image = self.decompress_stream(f)
+            print(f"Image dimensions: {self.width}x{self.height}")
+        
+            # Save restored image (BMP has no 16-bit grayscale, PNG keeps it)
+            output_path = compressed_file_path.replace('.hbd.compressed', '_hbd_restored.png')
+            restored_image.save(output_path, format='PNG')
+            print(f"Restored image saved: {output_path}")
+        
+            return restored_image
+        
+        except Exception as e:
+            print(f"Error during 16-bit decompression: {str(e)}")
+            raise e
+
+    def decompress_stream(self, f):
+        """Read a compressed 16-bit image from an open binary file and restore it"""
+        # Read metadata
+        self.width = int.from_bytes(f.read(4), byteorder='big')
+        self.height = int.from_bytes(f.read(4), byteorder='big')
+        codelength = int.from_bytes(f.read(1), byteorder='big')
+        for lzw in self.coders:
+            lzw.set_codelength(codelength)
+        entropy_coder = int.from_bytes(f.read(1), byteorder='big')
+        self.differencing = bool(int.from_bytes(f.read(1), byteorder='big'))
+        use_rle = int.from_bytes(f.read(1), byteorder='big')
+        scan_order = scan_order_name(int.from_bytes(f.read(1), byteorder='big'))
+        lengths = [int.from_bytes(f.read(4), byteorder='big') for _ in range(2)]
+        
+        if entropy_coder == ENTROPY_CODERS['huffman']:
+            values = read_huffman_blob(f)
+            encoded_planes = [values[:lengths[0]], values[lengths[0]:lengths[0] + lengths[1]]]
+        else:
+            encoded_planes = [np.frombuffer(f.read(2 * length), dtype='>u2').tolist()
+                              for length in lengths]
+        
+        # Decode both byte planes and join them to 16-bit values
+        planes = []
+        for encoded_values, lzw in zip(encoded_planes, self.coders):
+            symbols = [ord(c) for c in lzw.decode_codes(encoded_values)] if encoded_values else []
+            if use_rle:
+                symbols = rle_decode(symbols)
+            planes.append(unscan(np.array(symbols, dtype=np.uint16), (self.height, self.width), scan_order))
+        values = (planes[0] << 8) | planes[1]
+        samples = restore_differences(values) if self.differencing else values
+        
+        return Image.fromarray(samples)
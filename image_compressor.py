@@ -2,12 +2,35 @@ import numpy as np
 from PIL import Image
 import os
 from LZW import LZWCoding  # Doğrudan LZW.py'den import et
+from entropy_coding import ENTROPY_CODERS, write_huffman_blob, read_huffman_blob
+from run_length import RUN_LENGTH_MODES, resolve_run_length, rle_encode, rle_decode
+from pipeline import pack_codes, encode_planes
+from scan_order import SCAN_ORDERS, scan_order_name, scan, unscan
+from high_bit_depth_compressor import is_high_bit_depth
+
+# Header: width, height (4 bytes each), code length (2 bytes), entropy coder,
+# run-length and scan order (1 byte each)
+HEADER_SIZE = 13
 
 class ImageCompressor:
-    def __init__(self, image_path):
+    def __init__(self, image_path=None, codelength=None, entropy_coder='none', run_length='off', scan_order='row', pipelined=False, effort='fast'):
+        if entropy_coder not in ENTROPY_CODERS:
+            raise ValueError(f"Unknown entropy coder: {entropy_coder}")
         self.image_path = image_path
-        self.lzw = LZWCoding(os.path.splitext(image_path)[0], 'image')
-        self.original_size = os.path.getsize(image_path)
+        self.entropy_coder = entropy_coder
+        if run_length not in RUN_LENGTH_MODES:
+            raise ValueError(f"Unknown run-length mode: {run_length}")
+        self.run_length = run_length
+        if scan_order not in SCAN_ORDERS:
+            raise ValueError(f"Unknown scan order: {scan_order}")
+        self.scan_order = scan_order
+        # encode and write the codes in reader/encoder/writer threads
+        self.pipelined = pipelined
+        # image_path is None for in-memory use (compress_image/decompress_stream)
+        base_name = os.path.splitext(image_path)[0] if image_path else 'image'
+        self.lzw = LZWCoding(base_name, 'image', codelength, effort=effort)
+        self.coders = [self.lzw]
+        self.original_size = os.path.getsize(image_path) if image_path else None
         self.width = None
         self.height = None
         self.compression_ratio = None
@@ -28,95 +51,134 @@ class ImageCompressor:
     def compress(self):
         print(f"Compressing image: {self.image_path}")
         try:
-            # Read and convert image to grayscale
-            img = Image.open(self.image_path).convert('L')
-            img_array = np.array(img)
-            
-            self.width, self.height = img.size
-            print(f"Image dimensions: {self.width}x{self.height}")
-            
-            # Convert pixel values to string
-            pixel_string = ''.join([chr(pixel) for pixel in img_array.flatten()])
-            
-            # Compress using LZW
-            encoded_values = self.lzw.encode(pixel_string)
-            
-            # Save compressed file
+            # Read the image and save the compressed file
+            img = Image.open(self.image_path)
             output_path = f"{self.image_path}.compressed"
             with open(output_path, 'wb') as f:
-                # Write metadata
-                f.write(self.width.to_bytes(4, byteorder='big'))
-                f.write(self.height.to_bytes(4, byteorder='big'))
-                f.write(self.lzw.codelength.to_bytes(2, byteorder='big'))
-                
-                # Write encoded values with size limit
-                for value in encoded_values:
-                    # Ensure value doesn't exceed dictionary size limit
-                    if value < self.lzw.max_dict_size:
-                        f.write(value.to_bytes(2, byteorder='big'))
+                img_array, encoded_values = self.compress_image(img, f)
+            print(f"Image dimensions: {self.width}x{self.height}")
             
             print(f"Compressed file saved: {output_path}")
             self.calculate_compression_ratio(len(img_array.flatten()), len(encoded_values))
+            if self.entropy_coder == 'huffman':
+                # the entropy coded file is smaller than codelength bits per code
+                self.compression_ratio = self.original_size / os.path.getsize(output_path)
+                print(f"Entropy Coded Compression Ratio: {self.compression_ratio:.2f}")
             return encoded_values
             
         except Exception as e:
             print(f"Error during compression: {str(e)}")
             raise e
 
+    def compress_image(self, img, f):
+        """Compress a PIL image into an open binary file"""
+        if is_high_bit_depth(img):
+            raise ValueError("16-bit images would be truncated, use HighBitDepthCompressor")
+        # Convert image to grayscale
+        img_array = np.array(img.convert('L'))
+        
+        self.width, self.height = img.size
+        
+        # Optional run-length pre-pass for images with flat regions
+        symbols = scan(img_array, self.scan_order)
+        use_rle = resolve_run_length(self.run_length, [symbols], self.lzw)
+        if use_rle:
+            symbols = rle_encode(symbols)
+        
+        # Compress using LZW (in pipelined mode while the codes are written)
+        pipelined = self.pipelined and self.entropy_coder == 'none'
+        if not pipelined:
+            pixel_string = ''.join([chr(pixel) for pixel in symbols])
+            encoded_values = self.lzw.encode(pixel_string)
+        
+        # Write metadata
+        f.write(self.width.to_bytes(4, byteorder='big'))
+        f.write(self.height.to_bytes(4, byteorder='big'))
+        f.write(self.lzw.codelength.to_bytes(2, byteorder='big'))
+        f.write(ENTROPY_CODERS[self.entropy_coder].to_bytes(1, byteorder='big'))
+        f.write(int(use_rle).to_bytes(1, byteorder='big'))
+        f.write(SCAN_ORDERS[self.scan_order].to_bytes(1, byteorder='big'))
+        
+        if self.entropy_coder == 'huffman':
+            # Write the Huffman coded values
+            write_huffman_blob(f, encoded_values)
+        elif pipelined:
+            encoded_values, = encode_planes(f, [self.lzw], [symbols])
+        else:
+            # Write encoded values with size limit
+            # (ensure values don't exceed dictionary size limit)
+            f.write(pack_codes([value for value in encoded_values
+                                if value < self.lzw.max_dict_size]))
+        
+        return img_array, encoded_values
+
     def decompress(self, compressed_file_path):
         print(f"Decompressing file: {compressed_file_path}")
         try:
             with open(compressed_file_path, 'rb') as f:
-                # Read metadata
-                width = int.from_bytes(f.read(4), byteorder='big')
-                height = int.from_bytes(f.read(4), byteorder='big')
-                print(f"Image dimensions: {width}x{height}")
-                
-                self.lzw.codelength = int.from_bytes(f.read(2), byteorder='big')
-                print(f"Code length: {self.lzw.codelength}")
-                
-                # Read encoded values
-                encoded_values = []
-                while True:
-                    try:
-                        chunk = f.read(2)
-                        if not chunk or len(chunk) < 2:
-                            break
-                        value = int.from_bytes(chunk, byteorder='big')
-                        # Only include values within dictionary size limit
-                        if value < self.lzw.max_dict_size:
-                            encoded_values.append(value)
-                    except:
-                        break
-                
-                # Decode using LZW
-                decoded_string = self.lzw.decode(encoded_values)
-                
-                # Convert to pixel values
-                pixel_values = [ord(char) for char in decoded_string]
-                
-                # Ensure correct size
-                expected_size = width * height
-                if len(pixel_values) != expected_size:
-                    if len(pixel_values) < expected_size:
-                        pixel_values.extend([0] * (expected_size - len(pixel_values)))
-                    else:
-                        pixel_values = pixel_values[:expected_size]
-                
-                # Convert to image
-                img_array = np.array(pixel_values, dtype=np.uint8).reshape((height, width))
-                restored_image = Image.fromarray(img_array, mode='L')
-                
-                # Save restored image
-                output_path = compressed_file_path.replace('.compressed', '_restored.bmp')
-                restored_image.save(output_path, format='BMP')
-                print(f"Restored image saved: {output_path}")
-                
-                return restored_image
-                
+                restored_image = self.decompress_stream(f)
+            print(f"Image dimensions: {restored_image.size[0]}x{restored_image.size[1]}")
+            
+            # Save restored image
+            output_path = compressed_file_path.replace('.compressed', '_restored.bmp')
+            restored_image.save(output_path, format='BMP')
+            print(f"Restored image saved: {output_path}")
+            
+            return restored_image
+            
         except Exception as e:
             print(f"Error during decompression: {str(e)}")
             raise e
+
+    def decompress_stream(self, f):
+        """Read a compressed image from an open binary file and restore it"""
+        # Read metadata
+        width = int.from_bytes(f.read(4), byteorder='big')
+        height = int.from_bytes(f.read(4), byteorder='big')
+        
+        self.lzw.set_codelength(int.from_bytes(f.read(2), byteorder='big'))
+        entropy_coder = int.from_bytes(f.read(1), byteorder='big')
+        use_rle = int.from_bytes(f.read(1), byteorder='big')
+        scan_order = scan_order_name(int.from_bytes(f.read(1), byteorder='big'))
+        
+        # Read encoded values
+        encoded_values = []
+        if entropy_coder == ENTROPY_CODERS['huffman']:
+            encoded_values = read_huffman_blob(f)
+        else:
+            while True:
+                try:
+                    chunk = f.read(2)
+                    if not chunk or len(chunk) < 2:
+                        break
+                    value = int.from_bytes(chunk, byteorder='big')
+                    # Only include values within dictionary size limit
+                    if value < self.lzw.max_dict_size:
+                        encoded_values.append(value)
+                except:
+                    break
+        
+        # Decode using LZW
+        decoded_string = self.lzw.decode_codes(encoded_values)
+        
+        # Convert to pixel values
+        pixel_values = [ord(char) for char in decoded_string]
+        if use_rle:
+            pixel_values = rle_decode(pixel_values).tolist()
+        
+        # Ensure correct size
+        expected_size = width * height
+        if len(pixel_values) != expected_size:
+            if len(pixel_values) < expected_size:
+                pixel_values.extend([0] * (expected_size - len(pixel_values)))
+            else:
+                pixel_values = pixel_values[:expected_size]
+        
+        # Convert to image
+        img_array = unscan(np.array(pixel_values, dtype=np.uint8), (height, width), scan_order)
+        restored_image = Image.fromarray(img_array, mode='L')
+        
+        return restored_image
         
     def calculate_statistics(self, original_array, encoded_values):
         # Calculate entropy of original image
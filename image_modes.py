@@ -0,0 +1,77 @@
+import numpy as np
+from PIL import Image
+from color_transform import forward_color_transform, inverse_color_transform
+
+# Helpers shared by the colour levels (Level 4 and 5) for turning an image into
+# the 8-bit planes that are LZW encoded and back again. Palette images keep their
+# indices (one plane plus the palette in the header) and images with alpha carry
+# the alpha channel as a fourth plane instead of being flattened to RGB.
+# ------------------------------------------------------------------------------
+IMAGE_MODES = {'RGB': 0, 'RGBA': 1, 'P': 2, 'L': 3}
+PLANE_NAMES = {'RGB': ['R', 'G', 'B'], 'RGBA': ['R', 'G', 'B', 'A'], 'P': ['P'], 'L': ['L']}
+
+
+def select_mode(img, allow_grayscale=False):
+    """Pick the storage mode that keeps the image lossless"""
+    if allow_grayscale and img.mode == 'L':
+        return 'L'
+    if img.mode == 'P' and 'transparency' not in img.info:
+        return 'P'
+    if img.mode in ('RGBA', 'LA', 'PA', 'P') or 'transparency' in img.info:
+        return 'RGBA'
+    return 'RGB'
+
+
+def split_planes(img, color_transform='none', allow_grayscale=False):
+    """Return (mode, planes, palette) for the given PIL image"""
+    mode = select_mode(img, allow_grayscale)
+    if mode == 'L':
+        return mode, [np.array(img, dtype=np.uint8)], b''
+    if mode == 'P':
+        palette = img.getpalette() or []
+        return mode, [np.array(img, dtype=np.uint8)], bytes(palette)
+    if img.mode != mode:
+        img = img.convert(mode)
+    channels = [np.array(channel) for channel in img.split()]
+    channels[:3] = forward_color_transform(*channels[:3], color_transform)
+    return mode, list(channels), b''
+
+
+def merge_planes(mode, planes, palette=b'', color_transform='none'):
+    """Rebuild a PIL image from decoded planes"""
+    if mode == 'P':
+        height, width = planes[0].shape
+        restored_image = Image.frombytes('P', (width, height), planes[0].tobytes())
+        restored_image.putpalette(palette)
+        return restored_image
+    if mode == 'L':
+        return Image.fromarray(planes[0], mode='L')
+    planes = list(planes)
+    planes[:3] = inverse_color_transform(*planes[:3], color_transform)
+    return Image.merge(mode, [Image.fromarray(plane, mode='L') for plane in planes])
+
+
+def mode_name(code):
+    """Map a header byte back to the mode name"""
+    for name, value in IMAGE_MODES.items():
+        if value == code:
+            return name
+    raise ValueError(f"Unknown image mode code: {code}")
+
+
+def write_mode_info(f, mode, palette):
+    """Write the mode byte and, for palette images, the palette"""
+    f.write(IMAGE_MODES[mode].to_bytes(1, byteorder='big'))
+    if mode == 'P':
+        f.write(len(palette).to_bytes(2, byteorder='big'))
+        f.write(palette)
+
+
+def read_mode_info(f):
+    """Read what write_mode_info wrote and return (mode, palette)"""
+    mode = mode_name(int.from_bytes(f.read(1), byteorder='big'))
+    palette = b''
+    if mode == 'P':
+        palette_length = int.from_bytes(f.read(2), byteorder='big')
+        palette = f.read(palette_length)
+    return mode, palette
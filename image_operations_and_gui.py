@@ -1,13 +1,18 @@
 from PIL import Image, ImageTk
 import numpy as np
 import os
+import queue
+import threading
 import tkinter as tk
-from tkinter import filedialog, messagebox
+from tkinter import filedialog, messagebox, ttk
 from image_compressor import ImageCompressor  # Level2
 from level3_compressor import Level3Compressor
 from level4_compressor import Level4Compressor
 from level5_compressor import Level5Compressor
-from LZW import LZWCoding
+from high_bit_depth_compressor import HighBitDepthCompressor  # Level6
+from auto_compressor import AutoCompressor
+from progressive_compressor import ProgressiveCompressor
+from LZW import LZWCoding, CompressionCancelled
 
 # Declaration and initialization of the global variables used in this program
 # -------------------------------------------------------------------------------
@@ -18,8 +23,10 @@ image_file_path = current_directory + '/thumbs_up.bmp'   # default image
 # Main function where this program starts execution
 # -------------------------------------------------------------------------------
 def start():
+    global gui_root, progress_bar, status_label
     # Create window
     gui = tk.Tk()
+    gui_root = gui
     gui.title('Image Operations')
     gui['bg'] = 'White'
     
@@ -37,14 +44,11 @@ def start():
                              bg='DodgerBlue4', fg='white')
     left_frame.grid(row=0, column=0, padx=5)
     
-    gui_img = ImageTk.PhotoImage(file=image_file_path)
-    left_panel = tk.Label(left_frame, image=gui_img)
+    # the panel shows a preview that fits PREVIEW_SIZE (see the view cache)
+    left_panel = tk.Label(left_frame)
     left_panel.grid(padx=5, pady=5)
-    left_panel.photo_ref = gui_img
-    
-    # Get dimensions from original image
-    img_width = gui_img.width()
-    img_height = gui_img.height()
+    load_view_cache(image_file_path)
+    show_view(left_panel, 'original')
     
     # Right panel - Decompressed image (fixed 250x250 size)
     right_frame = tk.LabelFrame(images_frame, text="Decompressed Image", 
@@ -65,10 +69,12 @@ def start():
     
     buttons = [
         ('Open Image', lambda: open_image(left_panel, right_panel)),
+        ('Original', lambda: show_view(left_panel, 'original')),
         ('Grayscale', lambda: display_in_grayscale(left_panel)),
         ('Red', lambda: display_color_channel(left_panel, 'red')),
         ('Green', lambda: display_color_channel(left_panel, 'green')),
-        ('Blue', lambda: display_color_channel(left_panel, 'blue'))
+        ('Blue', lambda: display_color_channel(left_panel, 'blue')),
+        ('Full Size', display_full_resolution)
     ]
     
     for i, (text, command) in enumerate(buttons):
@@ -78,6 +84,16 @@ def start():
     # Create compression buttons with optimized spacing
     create_buttons(gui, left_panel, right_panel)
     
+    # Progress of the background job with a cancel button
+    job_frame = tk.Frame(frame, bg='DodgerBlue4')
+    job_frame.grid(row=3, column=0, columnspan=2, pady=2)
+    progress_bar = ttk.Progressbar(job_frame, length=300, maximum=100)
+    progress_bar.grid(row=0, column=0, padx=2)
+    tk.Button(job_frame, text='Cancel', width=8, command=cancel_job).grid(row=0, column=1, padx=2)
+    status_label = tk.Label(job_frame, text='Ready', bg='DodgerBlue4', fg='white')
+    status_label.grid(row=1, column=0, columnspan=2)
+    
+    gui.after(50, poll_job_queue)
     gui.mainloop()
 
 # Function for opening an image from a file
@@ -95,64 +111,99 @@ def open_image(left_panel, right_panel):
    # otherwise modify the global variable image_file_path and the displayed image
    else:
       image_file_path = file_path
-      img = ImageTk.PhotoImage(file = image_file_path) 
-      left_panel.config(image = img) 
-      left_panel.photo_ref = img
+      load_view_cache(image_file_path)
+      show_view(left_panel, 'original')
+
+# View cache
+# -------------------------------------------------------------------------------
+# The opened image is decoded once. Its preview (downsampled to fit the panel)
+# is kept as an RGB numpy array and the grayscale and channel views are computed
+# from it with NumPy the first time they are requested. The arrays and the
+# PhotoImage objects are cached until another image is opened, so switching
+# between views does not touch the file again. Full resolution views are only
+# computed when the user asks for them.
+PREVIEW_SIZE = (400, 400)
+CHANNEL_INDICES = {'red': 0, 'green': 1, 'blue': 2}
+view_cache = {}
+current_view = 'original'
+
+# Function that resets the view cache for the image at the given path
+# -------------------------------------------------------------------------------
+def load_view_cache(path):
+   view_cache.clear()
+   img = Image.open(path)
+   view_cache['path'] = path
+   view_cache['size'] = img.size
+   preview = img.copy()
+   preview.thumbnail(PREVIEW_SIZE)
+   view_cache[('original', False)] = pil_to_np(preview.convert('RGB'))
+
+# Function that computes a view (original, grayscale or a channel) of an RGB array
+# -------------------------------------------------------------------------------
+def compute_view(rgb_array, name):
+   if name == 'original':
+      return rgb_array
+   if name == 'grayscale':
+      # ITU-R 601-2 luma, the same weights PIL uses for convert('L')
+      weights = np.array([299, 587, 114], dtype=np.uint32)
+      return ((rgb_array @ weights + 500) // 1000).astype(np.uint8)
+   # keep only the given channel and make the other channels 0
+   channel_index = CHANNEL_INDICES[name]
+   channel_array = np.zeros_like(rgb_array)
+   channel_array[..., channel_index] = rgb_array[..., channel_index]
+   return channel_array
+
+# Function that returns the (cached) array of a view, full_resolution loads the
+# original image when it is needed for the first time
+# -------------------------------------------------------------------------------
+def get_view(name, full_resolution=False):
+   key = (name, full_resolution)
+   if key not in view_cache:
+      if full_resolution and ('original', True) not in view_cache:
+         view_cache[('original', True)] = pil_to_np(Image.open(view_cache['path']).convert('RGB'))
+      view_cache[key] = compute_view(view_cache[('original', full_resolution)], name)
+   return view_cache[key]
+
+# Function for displaying a (cached) preview of a view in the given panel
+# -------------------------------------------------------------------------------
+def show_view(image_panel, name):
+   global current_view
+   current_view = name
+   key = ('photo', name)
+   if key not in view_cache:
+      view_cache[key] = ImageTk.PhotoImage(image = np_to_pil(get_view(name)))
+   image_panel.config(image = view_cache[key])
+   image_panel.photo_ref = view_cache[key]
+
+# Function for displaying the current view at full resolution in a new window
+# -------------------------------------------------------------------------------
+def display_full_resolution():
+   window = tk.Toplevel()
+   window.title(f'{os.path.basename(view_cache["path"])} - {current_view}')
+   img = ImageTk.PhotoImage(image = np_to_pil(get_view(current_view, full_resolution = True)))
+   panel = tk.Label(window, image = img)
+   panel.pack()
+   panel.photo_ref = img
 
 # Function for displaying the current image in grayscale
 # -------------------------------------------------------------------------------
 def display_in_grayscale(image_panel):
-   # open the current image as a PIL image
-   img_rgb = Image.open(image_file_path)
-   # convert the image to grayscale (img_grayscale has only one color channel 
-   # whereas img_rgb has 3 color channels as red, green and blue)
-   img_grayscale = img_rgb.convert('L')
+   width, height = view_cache['size']
    print('\nFor the color image')
    print('----------------------------------------------------------------------')
-   width, height = img_rgb.size
    print('the width in pixels:', width, 'and the height in pixels:', height)
-   img_rgb_array = pil_to_np(img_rgb)
-   print('the dimensions of the image array:', img_rgb_array.shape)
+   print('the dimensions of the preview array:', get_view('original').shape)
    print('\nFor the grayscale image')
    print('----------------------------------------------------------------------')
-   width, height = img_grayscale.size
-   print('the width in pixels:', width, 'and the height in pixels:', height)
-   img_grayscale_array = pil_to_np(img_grayscale)
-   print('the dimensions of the image array:', img_grayscale_array.shape)
+   print('the dimensions of the preview array:', get_view('grayscale').shape)
    # modify the displayed image
-   img = ImageTk.PhotoImage(image = img_grayscale) 
-   image_panel.config(image = img) 
-   image_panel.photo_ref = img
+   show_view(image_panel, 'grayscale')
 
 # Function for displaying a given color channel of the current image
 # -------------------------------------------------------------------------------
 def display_color_channel(image_panel, channel):
-   # red channel -> 0, green channel -> 1 and blue channel -> 2
-   if channel == 'red':
-      channel_index = 0
-   elif channel == 'green':
-      channel_index = 1
-   else:
-      channel_index = 2
-   # open the current image as a PIL image
-   img_rgb = Image.open(image_file_path)
-   # convert the current image to a numpy array
-   image_array = pil_to_np(img_rgb)
-   # traverse all the pixels in the image array
-   n_rows = image_array.shape[0]
-   n_cols = image_array.shape[1]
-   for row in range(n_rows):
-      for col in range(n_cols):
-         # make all the values 0 for the color channels except the given channel
-         for rgb in range(3):
-            if (rgb != channel_index):
-               image_array[row][col][rgb] = 0
-   # convert the modified image array (numpy) to a PIL image
-   pil_img = np_to_pil(image_array)
-   # modify the displayed image
-   img = ImageTk.PhotoImage(image = pil_img) 
-   image_panel.config(image = img) 
-   image_panel.photo_ref = img
+   # channel is 'red', 'green' or 'blue' (see CHANNEL_INDICES)
+   show_view(image_panel, channel)
 
 # Function that converts a given PIL image to a numpy array and returns the array
 # -------------------------------------------------------------------------------
@@ -166,15 +217,116 @@ def np_to_pil(img_array):
    img = Image.fromarray(np.uint8(img_array))
    return img
 
+# Background jobs
+# -------------------------------------------------------------------------------
+# The codecs run in a worker thread so that the window stays responsive. The
+# worker reports progress events (processed, total) through a queue that the Tk
+# main loop polls, the Cancel button sets an event that makes the next progress
+# event raise CompressionCancelled, and completion notices are non-modal windows.
+job_queue = queue.Queue()
+cancel_event = threading.Event()
+job_thread = None
+gui_root = None
+progress_bar = None
+status_label = None
+
+# Function that runs job(progress) in a worker thread; on_done(result) is called
+# on the main thread with the returned value and returns the completion message
+# -------------------------------------------------------------------------------
+def run_in_background(title, job, on_done=None):
+    global job_thread
+    if job_thread is not None and job_thread.is_alive():
+        show_notice('Busy', 'Another job is still running.')
+        return
+    cancel_event.clear()
+    progress_bar['value'] = 0
+    status_label.config(text=f'{title}...')
+
+    def progress(processed, total):
+        if cancel_event.is_set():
+            raise CompressionCancelled()
+        job_queue.put(('progress', processed, total))
+
+    def worker():
+        try:
+            job_queue.put(('done', title, job(progress), on_done))
+        except CompressionCancelled:
+            job_queue.put(('cancelled', title))
+        except Exception as e:
+            print(f"{title} error: {str(e)}")
+            job_queue.put(('error', title, e))
+
+    job_thread = threading.Thread(target=worker, daemon=True)
+    job_thread.start()
+
+# Function that attaches the progress callback to all LZW coders of a compressor
+# -------------------------------------------------------------------------------
+def attach_progress(compressor, progress):
+    for lzw in compressor.coders:
+        lzw.progress = progress
+    return compressor
+
+# Function that handles the events of the worker thread (runs on the main thread)
+# -------------------------------------------------------------------------------
+def poll_job_queue():
+    try:
+        while True:
+            event = job_queue.get_nowait()
+            if event[0] == 'progress':
+                processed, total = event[1], event[2]
+                progress_bar['value'] = 100 * processed / total if total else 0
+                status_label.config(text=f'{processed:,} / {total:,} symbols')
+            elif event[0] == 'preview':
+                show_restored_image(event[1], event[2])
+            elif event[0] == 'done':
+                title, result, on_done = event[1], event[2], event[3]
+                progress_bar['value'] = 100
+                status_label.config(text=f'{title}: done')
+                message = on_done(result) if on_done else result
+                show_notice(title, message)
+            elif event[0] == 'cancelled':
+                progress_bar['value'] = 0
+                status_label.config(text=f'{event[1]}: cancelled')
+            else:
+                progress_bar['value'] = 0
+                status_label.config(text=f'{event[1]}: failed')
+                show_notice('Error', f'{event[1]} failed: {str(event[2])}')
+    except queue.Empty:
+        pass
+    gui_root.after(50, poll_job_queue)
+
+# Function for cancelling the running job
+# -------------------------------------------------------------------------------
+def cancel_job():
+    if job_thread is not None and job_thread.is_alive():
+        cancel_event.set()
+        status_label.config(text='Cancelling...')
+
+# Function that shows a non-modal notice window
+# -------------------------------------------------------------------------------
+def show_notice(title, message):
+    notice = tk.Toplevel(gui_root)
+    notice.title(title)
+    tk.Label(notice, text=message, justify='left', padx=10, pady=10).pack()
+    tk.Button(notice, text='OK', width=8, command=notice.destroy).pack(pady=5)
+
+# Function that shows a restored image in the right panel (main thread only)
+# -------------------------------------------------------------------------------
+def show_restored_image(right_panel, restored_image):
+    img = ImageTk.PhotoImage(image=restored_image)
+    right_panel.config(image=img)
+    right_panel.photo_ref = img
+
 # Function for compressing the current image using Level 2 compression
 # -------------------------------------------------------------------------------
 def compress_image(image_panel):
     global image_file_path
     if image_file_path:
-        compressor = ImageCompressor(image_file_path)
-        compressor.compress()
-        messagebox.showinfo("Compression Complete", 
-                          f"Image compressed!\nCompression Ratio: {compressor.compression_ratio:.2f}")
+        def job(progress, path=image_file_path):
+            compressor = attach_progress(ImageCompressor(path), progress)
+            compressor.compress()
+            return f"Image compressed!\nCompression Ratio: {compressor.compression_ratio:.2f}"
+        run_in_background("Compression Complete", job)
     else:
         messagebox.showerror("Error", "Please load an image first!")
 
@@ -188,112 +340,107 @@ def decompress_image(right_panel):
     )
     
     if compressed_file:
-        try:
+        def job(progress):
             # Sıkıştırılmış dosya yolunu kullanarak ImageCompressor oluştur
-            compressor = ImageCompressor(compressed_file)
-            restored_image = compressor.decompress(compressed_file)
-            
+            compressor = attach_progress(ImageCompressor(compressed_file), progress)
+            return compressor.decompress(compressed_file)
+        
+        def on_done(restored_image):
             # Restore edilmiş görüntüyü göster
-            img = ImageTk.PhotoImage(image=restored_image)
-            right_panel.config(image=img)
-            right_panel.photo_ref = img
-            
-            messagebox.showinfo("Success", "Image decompressed successfully!")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to decompress image: {str(e)}")
+            show_restored_image(right_panel, restored_image)
+            return "Image decompressed successfully!"
+        
+        run_in_background("Level 2 Decompression", job, on_done)
 
 # Function for compressing the current image using Level 3 compression
 # -------------------------------------------------------------------------------
 def compress_image_level3(image_panel):
     global image_file_path
     if image_file_path:
-        compressor = Level3Compressor(image_file_path)
-        compressor.compress()
-        messagebox.showinfo("Level 3 Compression Complete", 
-                          f"Image compressed using Level 3!\nCompression Ratio: {compressor.compression_ratio:.2f}")
+        def job(progress, path=image_file_path):
+            compressor = attach_progress(Level3Compressor(path), progress)
+            compressor.compress()
+            return f"Image compressed using Level 3!\nCompression Ratio: {compressor.compression_ratio:.2f}"
+        run_in_background("Level 3 Compression Complete", job)
     else:
         messagebox.showerror("Error", "Please load an image first!")
 
 # Function for decompressing a Level 3 compressed image file
 # -------------------------------------------------------------------------------
 def decompress_image_level3(right_panel):
-    try:
-        # Use wildcard pattern for macOS
-        compressed_file = filedialog.askopenfilename(
-            title="Select Level 3 compressed image file",
-            initialdir=current_directory,
-            filetypes=[("Compressed files", "*.compressed")]
-        )
+    # Use wildcard pattern for macOS
+    compressed_file = filedialog.askopenfilename(
+        title="Select Level 3 compressed image file",
+        initialdir=current_directory,
+        filetypes=[("Compressed files", "*.compressed")]
+    )
+    
+    if compressed_file:
+        # Check file extension manually
+        if not compressed_file.endswith('.level3.compressed'):
+            messagebox.showerror("Error", "Please select a .level3.compressed file")
+            return
         
-        if compressed_file:
-            # Check file extension manually
-            if not compressed_file.endswith('.level3.compressed'):
-                messagebox.showerror("Error", "Please select a .level3.compressed file")
-                return
-                
+        def job(progress):
             base_name = os.path.splitext(os.path.splitext(compressed_file)[0])[0]
-            compressor = Level3Compressor(base_name)
-            restored_image = compressor.decompress(compressed_file)
-            
-            img = ImageTk.PhotoImage(image=restored_image)
-            right_panel.config(image=img)
-            right_panel.photo_ref = img
-            
-            messagebox.showinfo("Success", "Image decompressed successfully using Level 3!")
-            
-    except Exception as e:
-        messagebox.showerror("Error", f"Failed to decompress Level 3 image: {str(e)}")
+            compressor = attach_progress(Level3Compressor(base_name), progress)
+            return compressor.decompress(compressed_file)
+        
+        def on_done(restored_image):
+            show_restored_image(right_panel, restored_image)
+            return "Image decompressed successfully using Level 3!"
+        
+        run_in_background("Level 3 Decompression", job, on_done)
 
 # Function for compressing the current image using Level 4 compression
 # -------------------------------------------------------------------------------
 def compress_image_level4(image_panel):
     global image_file_path
     if image_file_path:
-        compressor = Level4Compressor(image_file_path)
-        compressor.compress()
-        messagebox.showinfo("Level 4 Compression Complete", 
-                          f"Color image compressed using Level 4!\nCompression Ratio: {compressor.compression_ratio:.2f}")
+        def job(progress, path=image_file_path):
+            compressor = attach_progress(Level4Compressor(path), progress)
+            compressor.compress()
+            return f"Color image compressed using Level 4!\nCompression Ratio: {compressor.compression_ratio:.2f}"
+        run_in_background("Level 4 Compression Complete", job)
     else:
         messagebox.showerror("Error", "Please load an image first!")
 
 # Function for decompressing a Level 4 compressed image file
 # -------------------------------------------------------------------------------
 def decompress_image_level4(right_panel):
-    try:
-        # Use wildcard pattern for macOS
-        compressed_file = filedialog.askopenfilename(
-            title="Select Level 4 compressed image file",
-            initialdir=current_directory,
-            filetypes=[("Compressed files", "*.compressed")]
-        )
+    # Use wildcard pattern for macOS
+    compressed_file = filedialog.askopenfilename(
+        title="Select Level 4 compressed image file",
+        initialdir=current_directory,
+        filetypes=[("Compressed files", "*.compressed")]
+    )
+    
+    if compressed_file:
+        # Check file extension manually
+        if not compressed_file.endswith('.level4.compressed'):
+            messagebox.showerror("Error", "Please select a .level4.compressed file")
+            return
         
-        if compressed_file:
-            # Check file extension manually
-            if not compressed_file.endswith('.level4.compressed'):
-                messagebox.showerror("Error", "Please select a .level4.compressed file")
-                return
-                
-            compressor = Level4Compressor(compressed_file)
-            restored_image = compressor.decompress(compressed_file)
-            
-            img = ImageTk.PhotoImage(image=restored_image)
-            right_panel.config(image=img)
-            right_panel.photo_ref = img
-            
-            messagebox.showinfo("Success", "Image decompressed successfully using Level 4!")
-            
-    except Exception as e:
-        messagebox.showerror("Error", f"Failed to decompress Level 4 image: {str(e)}")
+        def job(progress):
+            compressor = attach_progress(Level4Compressor(compressed_file), progress)
+            return compressor.decompress(compressed_file)
+        
+        def on_done(restored_image):
+            show_restored_image(right_panel, restored_image)
+            return "Image decompressed successfully using Level 4!"
+        
+        run_in_background("Level 4 Decompression", job, on_done)
 
 # Function for compressing the current image using Level 5 compression
 # -------------------------------------------------------------------------------
 def compress_image_level5(image_panel):
     global image_file_path
     if image_file_path:
-        compressor = Level5Compressor(image_file_path)
-        compressor.compress()
-        messagebox.showinfo("Level 5 Compression Complete", 
-                          f"Color image compressed using Level 5!\nCompression Ratio: {compressor.compression_ratio:.2f}")
+        def job(progress, path=image_file_path):
+            compressor = attach_progress(Level5Compressor(path), progress)
+            compressor.compress()
+            return f"Color image compressed using Level 5!\nCompression Ratio: {compressor.compression_ratio:.2f}"
+        run_in_background("Level 5 Compression Complete", job)
     else:
         messagebox.showerror("Error", "Please load an image first!")
 
@@ -310,18 +457,131 @@ def decompress_image_level5(right_panel):
         if not compressed_file.endswith('.level5.compressed'):
             messagebox.showerror("Error", "Please select a .level5.compressed file")
             return
-            
-        try:
-            compressor = Level5Compressor(compressed_file)
-            restored_image = compressor.decompress(compressed_file)
-            
-            img = ImageTk.PhotoImage(image=restored_image)
-            right_panel.config(image=img)
-            right_panel.photo_ref = img
-            
-            messagebox.showinfo("Success", "Image decompressed successfully using Level 5!")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to decompress Level 5 image: {str(e)}")
+        
+        def job(progress):
+            compressor = attach_progress(Level5Compressor(compressed_file), progress)
+            return compressor.decompress(compressed_file)
+        
+        def on_done(restored_image):
+            show_restored_image(right_panel, restored_image)
+            return "Image decompressed successfully using Level 5!"
+        
+        run_in_background("Level 5 Decompression", job, on_done)
+
+# Function for compressing the current 16-bit grayscale image using Level 6
+# -------------------------------------------------------------------------------
+def compress_image_level6(image_panel):
+    global image_file_path
+    if image_file_path:
+        def job(progress, path=image_file_path):
+            compressor = attach_progress(HighBitDepthCompressor(path), progress)
+            compressor.compress()
+            return f"16-bit image compressed using Level 6!\nCompression Ratio: {compressor.compression_ratio:.2f}"
+        run_in_background("Level 6 Compression Complete", job)
+    else:
+        messagebox.showerror("Error", "Please load an image first!")
+
+# Function for decompressing a Level 6 (16-bit) compressed image file
+# -------------------------------------------------------------------------------
+def decompress_image_level6(right_panel):
+    compressed_file = filedialog.askopenfilename(
+        title="Select Level 6 compressed image file",
+        initialdir=current_directory,
+        filetypes=[("Compressed files", "*.compressed")]
+    )
+    
+    if compressed_file:
+        if not compressed_file.endswith('.hbd.compressed'):
+            messagebox.showerror("Error", "Please select a .hbd.compressed file")
+            return
+        
+        def job(progress):
+            compressor = attach_progress(HighBitDepthCompressor(compressed_file), progress)
+            return compressor.decompress(compressed_file)
+        
+        def on_done(restored_image):
+            # the panel shows 8 bits, keep the high byte of every sample
+            preview = Image.fromarray((np.array(restored_image) >> 8).astype(np.uint8), mode='L')
+            show_restored_image(right_panel, preview)
+            return "Image decompressed successfully using Level 6!"
+        
+        run_in_background("Level 6 Decompression", job, on_done)
+
+# Function for compressing the current image into the progressive format
+# -------------------------------------------------------------------------------
+def compress_image_progressive(image_panel):
+    global image_file_path
+    if image_file_path:
+        def job(progress, path=image_file_path):
+            compressor = attach_progress(ProgressiveCompressor(path), progress)
+            compressor.compress()
+            return f"Image compressed progressively!\nCompression Ratio: {compressor.compression_ratio:.2f}"
+        run_in_background("Progressive Compression Complete", job)
+    else:
+        messagebox.showerror("Error", "Please load an image first!")
+
+# Function for decompressing a progressive image file; every decoded resolution
+# is shown in the right panel as soon as it is available
+# -------------------------------------------------------------------------------
+def decompress_image_progressive(right_panel):
+    compressed_file = filedialog.askopenfilename(
+        title="Select progressive compressed image file",
+        initialdir=current_directory,
+        filetypes=[("Compressed files", "*.compressed")]
+    )
+    
+    if compressed_file:
+        if not compressed_file.endswith('.progressive.compressed'):
+            messagebox.showerror("Error", "Please select a .progressive.compressed file")
+            return
+        
+        def job(progress):
+            compressor = attach_progress(ProgressiveCompressor(compressed_file), progress)
+            for level, restored_image in compressor.iter_levels(compressed_file):
+                # scale the coarse levels up so that the preview keeps its size
+                preview = restored_image.resize((compressor.width, compressor.height), Image.NEAREST)
+                job_queue.put(('preview', right_panel, preview))
+            restored_image.save(compressed_file.replace('.progressive.compressed', '_progressive_restored.bmp'),
+                                format='BMP')
+            return restored_image
+        
+        def on_done(restored_image):
+            show_restored_image(right_panel, restored_image)
+            return "Image decompressed successfully (progressive)!"
+        
+        run_in_background("Progressive Decompression", job, on_done)
+
+# Function for compressing the current image with the automatically selected
+# level and parameters
+# -------------------------------------------------------------------------------
+def compress_image_auto(image_panel):
+    global image_file_path
+    if image_file_path:
+        run_auto_compression(image_file_path)
+    else:
+        messagebox.showerror("Error", "Please load an image first!")
+
+# Function for compressing a text file with the automatically selected parameters
+# -------------------------------------------------------------------------------
+def compress_text_auto():
+    text_file = filedialog.askopenfilename(
+        title="Select text file to compress",
+        initialdir=current_directory,
+        filetypes=[("Text files", "*.txt")]
+    )
+    
+    if text_file:
+        run_auto_compression(text_file)
+
+def run_auto_compression(input_path):
+    def job(progress):
+        compressor = AutoCompressor(input_path)
+        compressor.progress = progress
+        output_path = compressor.compress()
+        return (f"Selected configuration: {compressor.config}\n"
+                f"Compression Ratio: {compressor.compression_ratio:.2f}\n"
+                f"\nCompressed file saved as:\n{output_path}")
+    run_in_background("Auto Compression Complete", job)
 
 def compress_text_level1():
     text_file = filedialog.askopenfilename(
@@ -331,12 +591,13 @@ def compress_text_level1():
     )
     
     if text_file:
-        try:
+        def job(progress):
             # Get original file size
             original_size = os.path.getsize(text_file)
             
             # Create LZW instance with full path
             lzw = LZWCoding(os.path.splitext(text_file)[0], 'level1')
+            lzw.progress = progress
             
             # Compress the file and get statistics
             output_path, stats = lzw.compress_text_file()
@@ -346,7 +607,7 @@ def compress_text_level1():
             compression_ratio = original_size / compressed_size
             
             # Show statistics
-            stats_message = (
+            return (
                 f"Text Compression Statistics:\n"
                 f"------------------------\n"
                 f"Original Size: {original_size:,} bytes\n"
@@ -356,12 +617,8 @@ def compress_text_level1():
                 f"Average Code Length: {stats['avg_code_length']:.2f} bits\n"
                 f"\nCompressed file saved as:\n{output_path}"
             )
-            
-            messagebox.showinfo("Compression Complete", stats_message)
-            
-        except Exception as e:
-            print(f"Compression error: {str(e)}")
-            messagebox.showerror("Error", f"Failed to compress text file: {str(e)}")
+        
+        run_in_background("Compression Complete", job)
 
 def decompress_text_level1():
     compressed_file = filedialog.askopenfilename(
@@ -371,9 +628,10 @@ def decompress_text_level1():
     )
     
     if compressed_file:
-        try:
+        def job(progress):
             # Create LZW instance with full path
             lzw = LZWCoding(os.path.splitext(compressed_file)[0], 'level1')
+            lzw.progress = progress
             
             # Decompress the file
             output_path = lzw.decompress_text_file()
@@ -393,13 +651,10 @@ def decompress_text_level1():
             else:
                 integrity_msg = "\nFile integrity check: SKIPPED\nOriginal file not found for comparison."
             
-            messagebox.showinfo("Decompression Complete", 
-                              f"Text file decompressed successfully!\n"
-                              f"Saved as: {output_path}\n{integrity_msg}")
-            
-        except Exception as e:
-            print(f"Decompression error: {str(e)}")
-            messagebox.showerror("Error", f"Failed to decompress text file: {str(e)}")
+            return (f"Text file decompressed successfully!\n"
+                    f"Saved as: {output_path}\n{integrity_msg}")
+        
+        run_in_background("Decompression Complete", job)
 
 # Function for creating buttons
 # ----------------------------------------------------------------------------------
@@ -419,8 +674,10 @@ def create_buttons(window, image_panel, right_panel):
              command=compress_text_level1).grid(row=0, column=0, padx=2, pady=2)
     tk.Button(text_frame, text="Decompress", width=12,
              command=decompress_text_level1).grid(row=0, column=1, padx=2, pady=2)
+    tk.Button(text_frame, text="Compress Auto", width=12,
+             command=compress_text_auto).grid(row=1, column=0, padx=2, pady=2)
     
-    # Image compression (Levels 2-5)
+    # Image compression (Levels 2-6)
     img_frame = tk.LabelFrame(comp_frame, text="Image Compression", 
                             bg='DodgerBlue4', fg='white')
     img_frame.grid(row=1, column=0, columnspan=2, padx=5, pady=2, sticky='ew')
@@ -430,7 +687,9 @@ def create_buttons(window, image_panel, right_panel):
         ("L2", compress_image, decompress_image),  # L2 only needs one parameter
         ("L3", compress_image_level3, decompress_image_level3),
         ("L4", compress_image_level4, decompress_image_level4),
-        ("L5", compress_image_level5, decompress_image_level5)
+        ("L5", compress_image_level5, decompress_image_level5),
+        ("L6", compress_image_level6, decompress_image_level6),
+        ("Prog.", compress_image_progressive, decompress_image_progressive)
     ]
     
     for i, (level, comp_func, decomp_func) in enumerate(compression_buttons):
@@ -449,6 +708,11 @@ def create_buttons(window, image_panel, right_panel):
             command=lambda f=decomp_func, p=right_panel: f(p)  # image_panel yerine right_panel kullanın
         )
         decomp_btn.grid(row=i, column=1, padx=2, pady=2)
+    
+    # Automatic level selection (decompress with the button of the chosen level)
+    tk.Button(img_frame, text="Compress Auto", width=12,
+             command=lambda p=image_panel: compress_image_auto(p)).grid(
+                 row=len(compression_buttons), column=0, padx=2, pady=2)
 
 if __name__== '__main__':
     start()
\ No newline at end of file
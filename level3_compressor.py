@@ -2,17 +2,46 @@ import numpy as np
 from PIL import Image
 import os
 from LZW import LZWCoding
+from entropy_coding import ENTROPY_CODERS, write_huffman_blob, read_huffman_blob
+from near_lossless import quantize_differences, restore_quantized
+from run_length import RUN_LENGTH_MODES, resolve_run_length, rle_encode, rle_decode
+from pipeline import pack_codes, encode_planes
+from scan_order import SCAN_ORDERS, scan_order_name, scan, unscan
+from high_bit_depth_compressor import is_high_bit_depth
+
+# Header: width, height (4 bytes each), code length (2 bytes), first pixel,
+# entropy coder, near, run-length and scan order (1 byte each)
+HEADER_SIZE = 15
 
 class Level3Compressor:
-    def __init__(self, image_path):
+    def __init__(self, image_path=None, codelength=None, entropy_coder='none', near=0, run_length='off', scan_order='row', pipelined=False, effort='fast'):
+        if entropy_coder not in ENTROPY_CODERS:
+            raise ValueError(f"Unknown entropy coder: {entropy_coder}")
         self.image_path = image_path
-        self.lzw = LZWCoding(os.path.splitext(image_path)[0], 'level3')  # Specify level3 type
-        self.original_size = os.path.getsize(image_path)
+        self.entropy_coder = entropy_coder
+        # maximum absolute error per pixel (0 keeps the level lossless)
+        if not 0 <= near <= 255:
+            raise ValueError("near must be between 0 and 255")
+        self.near = near
+        if run_length not in RUN_LENGTH_MODES:
+            raise ValueError(f"Unknown run-length mode: {run_length}")
+        self.run_length = run_length
+        if scan_order not in SCAN_ORDERS:
+            raise ValueError(f"Unknown scan order: {scan_order}")
+        self.scan_order = scan_order
+        # encode and write the codes in reader/encoder/writer threads
+        self.pipelined = pipelined
+        # image_path is None for in-memory use (compress_image/decompress_stream)
+        base_name = os.path.splitext(image_path)[0] if image_path else 'image'
+        self.lzw = LZWCoding(base_name, 'level3', codelength, effort=effort)  # Specify level3 type
+        self.coders = [self.lzw]
+        self.original_size = os.path.getsize(image_path) if image_path else None
         self.width = None
         self.height = None
         self.compression_ratio = None
 
-    def calculate_differences(self, img_array):
+    @staticmethod
+    def calculate_differences(img_array):
         """Calculate row-wise and column-wise differences"""
         height, width = img_array.shape
         diff_image = np.zeros_like(img_array, dtype=np.int16)
@@ -63,83 +92,89 @@ class Level3Compressor:
     def compress(self):
         print(f"Level 3 - Compressing image: {self.image_path}")
         try:
-            # Read and convert image
-            img = Image.open(self.image_path).convert('L')
-            img_array = np.array(img)
-            
-            self.width, self.height = img.size
-            print(f"Image dimensions: {self.width}x{self.height}")
-            
-            # Calculate differences
-            diff_image = self.calculate_differences(img_array)
-            first_pixel = int(img_array[0, 0])
-            
-            # Convert differences to string (shift range from [-255,255] to [0,511])
-            diff_chars = []
-            for x in diff_image.flatten():
-                shifted_val = (int(x) + 255) & 0x1FF  # Ensure value is in [0,511]
-                if shifted_val < 0 or shifted_val > 511:
-                    print(f"Warning: Value {shifted_val} out of range")
-                diff_chars.append(chr(shifted_val))
-            
-            diff_string = ''.join(diff_chars)
-            if not diff_string:
-                raise ValueError("Empty difference string generated")
-            
-            # Compress using LZW
-            encoded_values = self.lzw.encode(diff_string)
-            
-            # Save compressed file
+            # Read the image and save the compressed file
+            img = Image.open(self.image_path)
             output_path = f"{self.image_path}.level3.compressed"
             with open(output_path, 'wb') as f:
-                f.write(int(self.width).to_bytes(4, byteorder='big'))
-                f.write(int(self.height).to_bytes(4, byteorder='big'))
-                f.write(int(self.lzw.codelength).to_bytes(2, byteorder='big'))
-                f.write(int(first_pixel).to_bytes(1, byteorder='big'))
-                
-                for value in encoded_values:
-                    f.write(int(value).to_bytes(2, byteorder='big'))
+                img_array, encoded_values = self.compress_image(img, f)
+            print(f"Image dimensions: {self.width}x{self.height}")
             
             print(f"Compressed file saved: {output_path}")
             self.calculate_statistics(img_array, encoded_values)
+            if self.entropy_coder == 'huffman':
+                # the entropy coded file is smaller than codelength bits per code
+                self.compression_ratio = self.original_size / os.path.getsize(output_path)
+                print(f"Entropy Coded Compression Ratio: {self.compression_ratio:.2f}")
             return encoded_values
             
         except Exception as e:
             print(f"Error during Level 3 compression: {str(e)}")
             raise e
 
+    def compress_image(self, img, f):
+        """Compress a PIL image into an open binary file"""
+        if is_high_bit_depth(img):
+            raise ValueError("16-bit images would be truncated, use HighBitDepthCompressor")
+        # Convert image
+        img_array = np.array(img.convert('L'))
+        
+        self.width, self.height = img.size
+        
+        # Calculate differences
+        if self.near:
+            # quantized differences (near-lossless, error <= near)
+            diff_image = quantize_differences(img_array, self.near)
+        else:
+            diff_image = self.calculate_differences(img_array)
+        first_pixel = int(img_array[0, 0])
+        
+        # Shift differences from [-255,255] to [0,511] and apply the optional
+        # run-length pre-pass (runs of equal differences in flat regions)
+        shifted = (scan(diff_image, self.scan_order).astype(np.int32) + 255) & 0x1FF
+        use_rle = resolve_run_length(self.run_length, [shifted], self.lzw)
+        if use_rle:
+            shifted = rle_encode(shifted)
+        
+        if not len(shifted):
+            raise ValueError("Empty difference string generated")
+        
+        # Compress using LZW (in pipelined mode while the codes are written)
+        pipelined = self.pipelined and self.entropy_coder == 'none'
+        if not pipelined:
+            # Convert differences to string
+            diff_chars = []
+            for shifted_val in shifted:
+                diff_chars.append(chr(shifted_val))
+            
+            diff_string = ''.join(diff_chars)
+            encoded_values = self.lzw.encode(diff_string)
+        
+        # Write compressed data
+        f.write(int(self.width).to_bytes(4, byteorder='big'))
+        f.write(int(self.height).to_bytes(4, byteorder='big'))
+        f.write(int(self.lzw.codelength).to_bytes(2, byteorder='big'))
+        f.write(int(first_pixel).to_bytes(1, byteorder='big'))
+        f.write(ENTROPY_CODERS[self.entropy_coder].to_bytes(1, byteorder='big'))
+        f.write(self.near.to_bytes(1, byteorder='big'))
+        f.write(int(use_rle).to_bytes(1, byteorder='big'))
+        f.write(SCAN_ORDERS[self.scan_order].to_bytes(1, byteorder='big'))
+        
+        if self.entropy_coder == 'huffman':
+            write_huffman_blob(f, encoded_values)
+        elif pipelined:
+            encoded_values, = encode_planes(f, [self.lzw], [shifted])
+        else:
+            f.write(pack_codes(encoded_values))
+        
+        return img_array, encoded_values
+
     def decompress(self, compressed_file_path):
         try:
             print(f"Level 3 - Decompressing file: {compressed_file_path}")
             
             with open(compressed_file_path, 'rb') as f:
-                # Read metadata
-                width = int.from_bytes(f.read(4), byteorder='big')
-                height = int.from_bytes(f.read(4), byteorder='big')
-                self.lzw.codelength = int.from_bytes(f.read(2), byteorder='big')
-                first_pixel = int.from_bytes(f.read(1), byteorder='big')
-                
-                print(f"Image dimensions: {width}x{height}")
-                print(f"Code length: {self.lzw.codelength}")
-                
-                # Read encoded values
-                encoded_values = []
-                while True:
-                    chunk = f.read(2)
-                    if not chunk or len(chunk) < 2:
-                        break
-                    value = int.from_bytes(chunk, byteorder='big')
-                    encoded_values.append(value)
-            
-            # Decode data and shift back from [0,511] to [-255,255]
-            decoded_string = self.lzw.decode(encoded_values)
-            diff_values = np.array([(ord(char) - 255) for char in decoded_string], 
-                                 dtype=np.int16)
-            diff_values = diff_values[:width*height].reshape(height, width)
-            
-            # Restore image
-            restored_array = self.restore_from_differences(diff_values, first_pixel)
-            restored_image = Image.fromarray(restored_array, mode='L')
+                restored_image = self.decompress_stream(f)
+            print(f"Image dimensions: {restored_image.size[0]}x{restored_image.size[1]}")
             
             # Save restored image
             output_path = compressed_file_path.replace('.level3.compressed', '_level3_restored.bmp')
@@ -152,6 +187,47 @@ class Level3Compressor:
             print(f"Error during Level 3 decompression: {str(e)}")
             raise e
 
+    def decompress_stream(self, f):
+        """Read a compressed image from an open binary file and restore it"""
+        # Read metadata
+        width = int.from_bytes(f.read(4), byteorder='big')
+        height = int.from_bytes(f.read(4), byteorder='big')
+        self.lzw.set_codelength(int.from_bytes(f.read(2), byteorder='big'))
+        first_pixel = int.from_bytes(f.read(1), byteorder='big')
+        entropy_coder = int.from_bytes(f.read(1), byteorder='big')
+        near = int.from_bytes(f.read(1), byteorder='big')
+        use_rle = int.from_bytes(f.read(1), byteorder='big')
+        scan_order = scan_order_name(int.from_bytes(f.read(1), byteorder='big'))
+        
+        # Read encoded values
+        encoded_values = []
+        if entropy_coder == ENTROPY_CODERS['huffman']:
+            encoded_values = read_huffman_blob(f)
+        else:
+            while True:
+                chunk = f.read(2)
+                if not chunk or len(chunk) < 2:
+                    break
+                value = int.from_bytes(chunk, byteorder='big')
+                encoded_values.append(value)
+        
+        # Decode data and shift back from [0,511] to [-255,255]
+        decoded_string = self.lzw.decode_codes(encoded_values)
+        shifted = [ord(char) for char in decoded_string]
+        if use_rle:
+            shifted = rle_decode(shifted)
+        diff_values = np.array(shifted, dtype=np.int16) - 255
+        diff_values = unscan(diff_values[:width*height], (height, width), scan_order)
+        
+        # Restore image
+        if near:
+            restored_array = restore_quantized(diff_values, near)
+        else:
+            restored_array = self.restore_from_differences(diff_values, first_pixel)
+        restored_image = Image.fromarray(restored_array, mode='L')
+        
+        return restored_image
+
     def calculate_statistics(self, original_array, encoded_values):
         # Calculate entropy
         pixel_counts = np.bincount(original_array.flatten())
@@ -2,64 +2,60 @@ import numpy as np
 from PIL import Image
 import os
 from LZW import LZWCoding
+from color_transform import COLOR_TRANSFORMS, transform_name
+from entropy_coding import ENTROPY_CODERS, write_huffman_blob, read_huffman_blob
+from run_length import RUN_LENGTH_MODES, resolve_run_length, rle_encode, rle_decode
+from pipeline import pack_codes, encode_planes
+from scan_order import SCAN_ORDERS, scan_order_name, scan, unscan
+from image_modes import PLANE_NAMES, split_planes, merge_planes, write_mode_info, read_mode_info
+from high_bit_depth_compressor import is_high_bit_depth
+
+# Fixed part of the header: width, height (2 bytes each), colour transform, code
+# length, entropy coder, run-length and scan order (1 byte each); the mode info
+# and the number of codes of every plane (4 bytes each) follow
+HEADER_SIZE = 9
 
 class Level4Compressor:
-    def __init__(self, image_path):
+    def __init__(self, image_path=None, color_transform='none', codelength=None, entropy_coder='none', run_length='off', scan_order='row', pipelined=False, effort='fast'):
+        if color_transform not in COLOR_TRANSFORMS:
+            raise ValueError(f"Unknown colour transform: {color_transform}")
+        if entropy_coder not in ENTROPY_CODERS:
+            raise ValueError(f"Unknown entropy coder: {entropy_coder}")
         self.image_path = image_path
-        # Initialize separate LZW coders for each channel
-        self.lzw_r = LZWCoding(os.path.splitext(image_path)[0], 'level4')
-        self.lzw_g = LZWCoding(os.path.splitext(image_path)[0], 'level4')
-        self.lzw_b = LZWCoding(os.path.splitext(image_path)[0], 'level4')
-        self.original_size = os.path.getsize(image_path)
+        self.color_transform = color_transform
+        self.entropy_coder = entropy_coder
+        if run_length not in RUN_LENGTH_MODES:
+            raise ValueError(f"Unknown run-length mode: {run_length}")
+        self.run_length = run_length
+        if scan_order not in SCAN_ORDERS:
+            raise ValueError(f"Unknown scan order: {scan_order}")
+        self.scan_order = scan_order
+        # encode and write the codes in reader/encoder/writer threads
+        self.pipelined = pipelined
+        # Initialize separate LZW coders for each channel (alpha is optional)
+        # image_path is None for in-memory use (compress_image/decompress_stream)
+        base_name = os.path.splitext(image_path)[0] if image_path else 'image'
+        self.lzw_r = LZWCoding(base_name, 'level4', codelength, effort=effort)
+        self.lzw_g = LZWCoding(base_name, 'level4', codelength, effort=effort)
+        self.lzw_b = LZWCoding(base_name, 'level4', codelength, effort=effort)
+        self.lzw_a = LZWCoding(base_name, 'level4', codelength, effort=effort)
+        self.coders = [self.lzw_r, self.lzw_g, self.lzw_b, self.lzw_a]
+        self.original_size = os.path.getsize(image_path) if image_path else None
         self.width = None
         self.height = None
+        self.mode = None
         self.compression_ratio = None
 
     def compress(self):
         print(f"Level 4 - Compressing color image: {self.image_path}")
         try:
-            # Read color image
+            # Read color image (palette and alpha images keep their layout)
             img = Image.open(self.image_path)
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            self.width, self.height = img.size
-            print(f"Image dimensions: {self.width}x{self.height}")
-            
-            # Split into RGB channels
-            r, g, b = img.split()
-            
-            # Convert to numpy arrays
-            r_array = np.array(r)
-            g_array = np.array(g)
-            b_array = np.array(b)
-            
-            # Convert each channel to string
-            r_string = ''.join([chr(x) for x in r_array.flatten()])
-            g_string = ''.join([chr(x) for x in g_array.flatten()])
-            b_string = ''.join([chr(x) for x in b_array.flatten()])
-            
-            # Compress each channel separately
-            r_encoded = self.lzw_r.encode(r_string)
-            g_encoded = self.lzw_g.encode(g_string)
-            b_encoded = self.lzw_b.encode(b_string)
-            
-            # Save compressed file
             output_path = f"{self.image_path}.level4.compressed"
             with open(output_path, 'wb') as f:
-                # Write metadata
-                f.write(self.width.to_bytes(2, byteorder='big'))
-                f.write(self.height.to_bytes(2, byteorder='big'))
-                
-                # Write lengths of encoded data
-                f.write(len(r_encoded).to_bytes(4, byteorder='big'))
-                f.write(len(g_encoded).to_bytes(4, byteorder='big'))
-                f.write(len(b_encoded).to_bytes(4, byteorder='big'))
-                
-                # Write encoded data for each channel
-                for encoded_data in [r_encoded, g_encoded, b_encoded]:
-                    for value in encoded_data:
-                        f.write(value.to_bytes(2, byteorder='big'))
+                self.compress_image(img, f)
+            print(f"Image dimensions: {self.width}x{self.height}")
+            print(f"Storage mode: {self.mode} ({len(PLANE_NAMES[self.mode])} planes)")
             
             # Calculate compression statistics
             compressed_size = os.path.getsize(output_path)
@@ -76,49 +72,71 @@ class Level4Compressor:
             print(f"Error during Level 4 compression: {str(e)}")
             raise e
 
+    def compress_image(self, img, f):
+        """Compress a PIL image into an open binary file"""
+        if is_high_bit_depth(img):
+            raise ValueError("16-bit images would be truncated, use HighBitDepthCompressor")
+        self.width, self.height = img.size
+        
+        # Split into planes and decorrelate the colour channels
+        self.mode, planes, palette = split_planes(img, self.color_transform)
+        
+        # Optional run-length pre-pass for images with flat regions
+        symbol_planes = [scan(plane, self.scan_order) for plane in planes]
+        use_rle = resolve_run_length(self.run_length, symbol_planes, self.lzw_r)
+        if use_rle:
+            symbol_planes = [rle_encode(symbols) for symbols in symbol_planes]
+        
+        # Compress each plane separately
+        # (in pipelined mode while the codes are written)
+        pipelined = self.pipelined and self.entropy_coder == 'none'
+        if not pipelined:
+            encoded_planes = []
+            for symbols, lzw in zip(symbol_planes, self.coders):
+                plane_string = ''.join([chr(x) for x in symbols])
+                encoded_planes.append(lzw.encode(plane_string))
+        
+        # Write metadata
+        f.write(self.width.to_bytes(2, byteorder='big'))
+        f.write(self.height.to_bytes(2, byteorder='big'))
+        f.write(COLOR_TRANSFORMS[self.color_transform].to_bytes(1, byteorder='big'))
+        f.write(self.lzw_r.codelength.to_bytes(1, byteorder='big'))
+        f.write(ENTROPY_CODERS[self.entropy_coder].to_bytes(1, byteorder='big'))
+        f.write(int(use_rle).to_bytes(1, byteorder='big'))
+        f.write(SCAN_ORDERS[self.scan_order].to_bytes(1, byteorder='big'))
+        write_mode_info(f, self.mode, palette)
+        
+        # Write lengths of encoded data (in pipelined mode they are known and
+        # written after the codes)
+        lengths_position = f.tell()
+        for index in range(len(symbol_planes)):
+            length = 0 if pipelined else len(encoded_planes[index])
+            f.write(length.to_bytes(4, byteorder='big'))
+        
+        # Write encoded data for each plane (one Huffman table for all planes)
+        if self.entropy_coder == 'huffman':
+            write_huffman_blob(f, [value for encoded_data in encoded_planes
+                                   for value in encoded_data])
+        elif pipelined:
+            encoded_planes = encode_planes(f, self.coders, symbol_planes)
+            end = f.tell()
+            f.seek(lengths_position)
+            for encoded_data in encoded_planes:
+                f.write(len(encoded_data).to_bytes(4, byteorder='big'))
+            f.seek(end)
+        else:
+            for encoded_data in encoded_planes:
+                f.write(pack_codes(encoded_data))
+        
+        return encoded_planes
+
     def decompress(self, compressed_file_path):
         try:
             print(f"Level 4 - Decompressing file: {compressed_file_path}")
             
             with open(compressed_file_path, 'rb') as f:
-                # Read metadata
-                self.width = int.from_bytes(f.read(2), byteorder='big')
-                self.height = int.from_bytes(f.read(2), byteorder='big')
-                
-                # Read lengths
-                r_length = int.from_bytes(f.read(4), byteorder='big')
-                g_length = int.from_bytes(f.read(4), byteorder='big')
-                b_length = int.from_bytes(f.read(4), byteorder='big')
-                
-                # Read encoded values for each channel
-                def read_encoded_values(length):
-                    values = []
-                    for _ in range(length):
-                        value = int.from_bytes(f.read(2), byteorder='big')
-                        values.append(value)
-                    return values
-                
-                r_encoded = read_encoded_values(r_length)
-                g_encoded = read_encoded_values(g_length)
-                b_encoded = read_encoded_values(b_length)
-            
-            # Decode each channel
-            r_string = self.lzw_r.decode(r_encoded)
-            g_string = self.lzw_g.decode(g_encoded)
-            b_string = self.lzw_b.decode(b_encoded)
-            
-            # Convert to numpy arrays
-            r_array = np.array([ord(c) for c in r_string], dtype=np.uint8).reshape((self.height, self.width))
-            g_array = np.array([ord(c) for c in g_string], dtype=np.uint8).reshape((self.height, self.width))
-            b_array = np.array([ord(c) for c in b_string], dtype=np.uint8).reshape((self.height, self.width))
-            
-            # Create PIL images for each channel
-            r_img = Image.fromarray(r_array, mode='L')
-            g_img = Image.fromarray(g_array, mode='L')
-            b_img = Image.fromarray(b_array, mode='L')
-            
-            # Merge channels
-            restored_image = Image.merge('RGB', (r_img, g_img, b_img))
+                restored_image = self.decompress_stream(f)
+            print(f"Image dimensions: {self.width}x{self.height}")
             
             # Save restored image
             output_path = compressed_file_path.replace('.level4.compressed', '_level4_restored.bmp')
@@ -126,7 +144,54 @@ class Level4Compressor:
             print(f"Restored image saved: {output_path}")
             
             return restored_image
-            
+        
         except Exception as e:
             print(f"Error during Level 4 decompression: {str(e)}")
-            raise e
\ No newline at end of file
+            raise e
+
+    def decompress_stream(self, f):
+        """Read a compressed image from an open binary file and restore it"""
+        # Read metadata
+        self.width = int.from_bytes(f.read(2), byteorder='big')
+        self.height = int.from_bytes(f.read(2), byteorder='big')
+        color_transform = transform_name(int.from_bytes(f.read(1), byteorder='big'))
+        codelength = int.from_bytes(f.read(1), byteorder='big')
+        for lzw in self.coders:
+            lzw.set_codelength(codelength)
+        entropy_coder = int.from_bytes(f.read(1), byteorder='big')
+        use_rle = int.from_bytes(f.read(1), byteorder='big')
+        scan_order = scan_order_name(int.from_bytes(f.read(1), byteorder='big'))
+        self.mode, palette = read_mode_info(f)
+        plane_count = len(PLANE_NAMES[self.mode])
+        
+        # Read lengths
+        lengths = [int.from_bytes(f.read(4), byteorder='big') for _ in range(plane_count)]
+        
+        # Read encoded values for each plane
+        def read_encoded_values(length):
+            values = []
+            for _ in range(length):
+                value = int.from_bytes(f.read(2), byteorder='big')
+                values.append(value)
+            return values
+        
+        if entropy_coder == ENTROPY_CODERS['huffman']:
+            values = read_huffman_blob(f)
+            offsets = np.cumsum([0] + lengths)
+            encoded_planes = [values[offsets[i]:offsets[i + 1]] for i in range(plane_count)]
+        else:
+            encoded_planes = [read_encoded_values(length) for length in lengths]
+        
+        # Decode each plane and convert to numpy arrays
+        planes = []
+        for encoded_values, lzw in zip(encoded_planes, self.coders):
+            plane_string = lzw.decode_codes(encoded_values)
+            symbols = [ord(c) for c in plane_string]
+            if use_rle:
+                symbols = rle_decode(symbols)
+            planes.append(unscan(np.array(symbols, dtype=np.uint8), (self.height, self.width), scan_order))
+        
+        # Merge planes
+        restored_image = merge_planes(self.mode, planes, palette, color_transform)
+        
+        return restored_image
\ No newline at end of file
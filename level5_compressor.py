@@ -2,17 +2,57 @@ import numpy as np
 from PIL import Image
 import os
 from LZW import LZWCoding
+from color_transform import COLOR_TRANSFORMS, transform_name
+from entropy_coding import ENTROPY_CODERS, write_huffman_blob, read_huffman_blob
+from near_lossless import quantize_differences, restore_quantized
+from run_length import RUN_LENGTH_MODES, resolve_run_length, rle_encode, rle_decode
+from pipeline import pack_codes, encode_planes
+from scan_order import SCAN_ORDERS, scan_order_name, scan, unscan
+from image_modes import PLANE_NAMES, split_planes, merge_planes, write_mode_info, read_mode_info
+from high_bit_depth_compressor import is_high_bit_depth
+
+# Fixed part of the header: width, height (2 bytes each), colour transform, code
+# length, entropy coder, near, run-length and scan order (1 byte each); the mode
+# info, the first pixel (1 byte) and the number of codes (4 bytes) of every
+# plane follow
+HEADER_SIZE = 10
 
 class Level5Compressor:
-    def __init__(self, image_path):
+    def __init__(self, image_path=None, color_transform='none', codelength=None, entropy_coder='none', near=0, run_length='off', scan_order='row', pipelined=False, effort='fast'):
+        if color_transform not in COLOR_TRANSFORMS:
+            raise ValueError(f"Unknown colour transform: {color_transform}")
+        if entropy_coder not in ENTROPY_CODERS:
+            raise ValueError(f"Unknown entropy coder: {entropy_coder}")
         self.image_path = image_path
-        # Initialize LZW coders for each channel's differences
-        self.lzw_r = LZWCoding(os.path.splitext(image_path)[0] + "_r", 'level5')
-        self.lzw_g = LZWCoding(os.path.splitext(image_path)[0] + "_g", 'level5')
-        self.lzw_b = LZWCoding(os.path.splitext(image_path)[0] + "_b", 'level5')
-        self.original_size = os.path.getsize(image_path)
+        self.color_transform = color_transform
+        self.entropy_coder = entropy_coder
+        # maximum absolute error per pixel (0 keeps the level lossless)
+        if not 0 <= near <= 255:
+            raise ValueError("near must be between 0 and 255")
+        if near and color_transform != 'none':
+            # the error bound would not hold after the inverse colour transform
+            raise ValueError("near-lossless mode requires color_transform='none'")
+        self.near = near
+        if run_length not in RUN_LENGTH_MODES:
+            raise ValueError(f"Unknown run-length mode: {run_length}")
+        self.run_length = run_length
+        if scan_order not in SCAN_ORDERS:
+            raise ValueError(f"Unknown scan order: {scan_order}")
+        self.scan_order = scan_order
+        # encode and write the codes in reader/encoder/writer threads
+        self.pipelined = pipelined
+        # Initialize LZW coders for each channel's differences (alpha is optional)
+        # image_path is None for in-memory use (compress_image/decompress_stream)
+        base_name = os.path.splitext(image_path)[0] if image_path else 'image'
+        self.lzw_r = LZWCoding(base_name + "_r", 'level5', codelength, effort=effort)
+        self.lzw_g = LZWCoding(base_name + "_g", 'level5', codelength, effort=effort)
+        self.lzw_b = LZWCoding(base_name + "_b", 'level5', codelength, effort=effort)
+        self.lzw_a = LZWCoding(base_name + "_a", 'level5', codelength, effort=effort)
+        self.coders = [self.lzw_r, self.lzw_g, self.lzw_b, self.lzw_a]
+        self.original_size = os.path.getsize(image_path) if image_path else None
         self.width = None
         self.height = None
+        self.mode = None
         self.compression_ratio = None
         self.entropy = {"R": 0, "G": 0, "B": 0}
         self.avg_code_length = {"R": 0, "G": 0, "B": 0}
@@ -69,59 +109,22 @@ class Level5Compressor:
     def compress(self):
         print(f"Level 5 - Compressing color image: {self.image_path}")
         try:
-            # Read color image
+            # Read color image (palette and alpha images keep their layout)
             img = Image.open(self.image_path)
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            self.width, self.height = img.size
-            print(f"Image dimensions: {self.width}x{self.height}")
-            
-            # Split into RGB channels
-            r, g, b = img.split()
-            
-            # Calculate differences for each channel
-            r_diff = self.calculate_differences(np.array(r))
-            g_diff = self.calculate_differences(np.array(g))
-            b_diff = self.calculate_differences(np.array(b))
-            
-            # Convert differences to strings (shift range from [-255,255] to [0,511])
-            def diff_to_string(diff_array):
-                return ''.join([chr((int(x) + 255) & 0x1FF) for x in diff_array.flatten()])
-            
-            r_string = diff_to_string(r_diff)
-            g_string = diff_to_string(g_diff)
-            b_string = diff_to_string(b_diff)
-            
-            # Compress each channel's differences
-            r_encoded = self.lzw_r.encode(r_string)
-            g_encoded = self.lzw_g.encode(g_string)
-            b_encoded = self.lzw_b.encode(b_string)
-            
-            # Save compressed file
             output_path = f"{self.image_path}.level5.compressed"
             with open(output_path, 'wb') as f:
-                # Write metadata
-                f.write(self.width.to_bytes(2, byteorder='big'))
-                f.write(self.height.to_bytes(2, byteorder='big'))
-                
-                # Write first pixels
-                f.write(int(r_diff[0, 0]).to_bytes(1, byteorder='big'))
-                f.write(int(g_diff[0, 0]).to_bytes(1, byteorder='big'))
-                f.write(int(b_diff[0, 0]).to_bytes(1, byteorder='big'))
-                
-                # Write lengths of encoded data
-                f.write(len(r_encoded).to_bytes(4, byteorder='big'))
-                f.write(len(g_encoded).to_bytes(4, byteorder='big'))
-                f.write(len(b_encoded).to_bytes(4, byteorder='big'))
-                
-                # Write encoded data
-                for encoded_data in [r_encoded, g_encoded, b_encoded]:
-                    for value in encoded_data:
-                        f.write(value.to_bytes(2, byteorder='big'))
+                diffs, encoded_planes = self.compress_image(img, f)
+            print(f"Image dimensions: {self.width}x{self.height}")
+            print(f"Storage mode: {self.mode} ({len(PLANE_NAMES[self.mode])} planes)")
+            if self.near and self.mode == 'P':
+                print("Palette image: near-lossless mode disabled")
             
             # Calculate statistics
-            self.calculate_statistics(r_diff, g_diff, b_diff, r_encoded, g_encoded, b_encoded)
+            self.calculate_statistics(diffs, encoded_planes)
+            if self.entropy_coder == 'huffman':
+                # the entropy coded file is smaller than codelength bits per code
+                self.compression_ratio = self.original_size / os.path.getsize(output_path)
+                print(f"Entropy Coded Compression Ratio: {self.compression_ratio:.2f}")
             
             return True
             
@@ -129,56 +132,87 @@ class Level5Compressor:
             print(f"Error during Level 5 compression: {str(e)}")
             raise e
 
+    def compress_image(self, img, f):
+        """Compress a PIL image into an open binary file"""
+        if is_high_bit_depth(img):
+            raise ValueError("16-bit images would be truncated, use HighBitDepthCompressor")
+        self.width, self.height = img.size
+        
+        # Split into planes and decorrelate the colour channels
+        self.mode, planes, palette = split_planes(img, self.color_transform)
+        near = self.near
+        if near and self.mode == 'P':
+            # an error in a palette index is not bounded in colour space
+            # (only for this image, the next one uses self.near again)
+            near = 0
+        
+        # Calculate differences for each plane
+        # (quantized differences in near-lossless mode, error <= near)
+        if near:
+            diffs = [quantize_differences(plane, near) for plane in planes]
+        else:
+            diffs = [self.calculate_differences(plane) for plane in planes]
+        
+        # Shift differences from [-255,255] to [0,511] and apply the optional
+        # run-length pre-pass (runs of equal differences in flat regions)
+        symbol_planes = [(scan(diff, self.scan_order).astype(np.int32) + 255) & 0x1FF for diff in diffs]
+        use_rle = resolve_run_length(self.run_length, symbol_planes, self.lzw_r)
+        if use_rle:
+            symbol_planes = [rle_encode(symbols) for symbols in symbol_planes]
+        
+        # Compress each plane's differences
+        # (in pipelined mode while the codes are written)
+        pipelined = self.pipelined and self.entropy_coder == 'none'
+        if not pipelined:
+            encoded_planes = [lzw.encode(''.join([chr(x) for x in symbols]))
+                              for symbols, lzw in zip(symbol_planes, self.coders)]
+        
+        # Write metadata
+        f.write(self.width.to_bytes(2, byteorder='big'))
+        f.write(self.height.to_bytes(2, byteorder='big'))
+        f.write(COLOR_TRANSFORMS[self.color_transform].to_bytes(1, byteorder='big'))
+        f.write(self.lzw_r.codelength.to_bytes(1, byteorder='big'))
+        f.write(ENTROPY_CODERS[self.entropy_coder].to_bytes(1, byteorder='big'))
+        f.write(near.to_bytes(1, byteorder='big'))
+        f.write(int(use_rle).to_bytes(1, byteorder='big'))
+        f.write(SCAN_ORDERS[self.scan_order].to_bytes(1, byteorder='big'))
+        write_mode_info(f, self.mode, palette)
+        
+        # Write first pixels
+        for diff in diffs:
+            f.write(int(diff[0, 0]).to_bytes(1, byteorder='big'))
+        
+        # Write lengths of encoded data (in pipelined mode they are known and
+        # written after the codes)
+        lengths_position = f.tell()
+        for index in range(len(symbol_planes)):
+            length = 0 if pipelined else len(encoded_planes[index])
+            f.write(length.to_bytes(4, byteorder='big'))
+        
+        # Write encoded data (one Huffman table for all planes)
+        if self.entropy_coder == 'huffman':
+            write_huffman_blob(f, [value for encoded_data in encoded_planes
+                                   for value in encoded_data])
+        elif pipelined:
+            encoded_planes = encode_planes(f, self.coders, symbol_planes)
+            end = f.tell()
+            f.seek(lengths_position)
+            for encoded_data in encoded_planes:
+                f.write(len(encoded_data).to_bytes(4, byteorder='big'))
+            f.seek(end)
+        else:
+            for encoded_data in encoded_planes:
+                f.write(pack_codes(encoded_data))
+        
+        return diffs, encoded_planes
+
     def decompress(self, compressed_file_path):
         try:
             print(f"Level 5 - Decompressing file: {compressed_file_path}")
             
             with open(compressed_file_path, 'rb') as f:
-                # Read metadata
-                self.width = int.from_bytes(f.read(2), byteorder='big')
-                self.height = int.from_bytes(f.read(2), byteorder='big')
-                
-                # Read first pixels
-                r_first = int.from_bytes(f.read(1), byteorder='big')
-                g_first = int.from_bytes(f.read(1), byteorder='big')
-                b_first = int.from_bytes(f.read(1), byteorder='big')
-                
-                # Read lengths
-                r_length = int.from_bytes(f.read(4), byteorder='big')
-                g_length = int.from_bytes(f.read(4), byteorder='big')
-                b_length = int.from_bytes(f.read(4), byteorder='big')
-                
-                # Read encoded values
-                def read_encoded_values(length):
-                    return [int.from_bytes(f.read(2), byteorder='big') for _ in range(length)]
-                
-                r_encoded = read_encoded_values(r_length)
-                g_encoded = read_encoded_values(g_length)
-                b_encoded = read_encoded_values(b_length)
-            
-            # Decode differences
-            def decode_channel(encoded_values, lzw):
-                decoded = lzw.decode(encoded_values)
-                diff_values = np.array([(ord(char) - 255) for char in decoded], 
-                                     dtype=np.int16)
-                return diff_values[:self.width*self.height].reshape((self.height, self.width))
-            
-            r_diff = decode_channel(r_encoded, self.lzw_r)
-            g_diff = decode_channel(g_encoded, self.lzw_g)
-            b_diff = decode_channel(b_encoded, self.lzw_b)
-            
-            # Restore original channels
-            r_array = self.restore_from_differences(r_diff)
-            g_array = self.restore_from_differences(g_diff)
-            b_array = self.restore_from_differences(b_diff)
-            
-            # Create channel images
-            r_img = Image.fromarray(r_array, mode='L')
-            g_img = Image.fromarray(g_array, mode='L')
-            b_img = Image.fromarray(b_array, mode='L')
-            
-            # Merge channels
-            restored_image = Image.merge('RGB', (r_img, g_img, b_img))
+                restored_image = self.decompress_stream(f)
+            print(f"Image dimensions: {self.width}x{self.height}")
             
             # Save restored image
             output_path = compressed_file_path.replace('.level5.compressed', '_level5_restored.bmp')
@@ -191,9 +225,67 @@ class Level5Compressor:
             print(f"Error during Level 5 decompression: {str(e)}")
             raise e
 
-    def calculate_statistics(self, r_diff, g_diff, b_diff, r_encoded, g_encoded, b_encoded):
+    def decompress_stream(self, f):
+        """Read a compressed image from an open binary file and restore it"""
+        # Read metadata
+        self.width = int.from_bytes(f.read(2), byteorder='big')
+        self.height = int.from_bytes(f.read(2), byteorder='big')
+        color_transform = transform_name(int.from_bytes(f.read(1), byteorder='big'))
+        codelength = int.from_bytes(f.read(1), byteorder='big')
+        for lzw in self.coders:
+            lzw.set_codelength(codelength)
+        entropy_coder = int.from_bytes(f.read(1), byteorder='big')
+        near = int.from_bytes(f.read(1), byteorder='big')
+        use_rle = int.from_bytes(f.read(1), byteorder='big')
+        scan_order = scan_order_name(int.from_bytes(f.read(1), byteorder='big'))
+        self.mode, palette = read_mode_info(f)
+        plane_count = len(PLANE_NAMES[self.mode])
+        
+        # Read first pixels (also stored as the first difference value)
+        first_pixels = [int.from_bytes(f.read(1), byteorder='big') for _ in range(plane_count)]
+        
+        # Read lengths
+        lengths = [int.from_bytes(f.read(4), byteorder='big') for _ in range(plane_count)]
+        
+        # Read encoded values
+        def read_encoded_values(length):
+            return [int.from_bytes(f.read(2), byteorder='big') for _ in range(length)]
+        
+        if entropy_coder == ENTROPY_CODERS['huffman']:
+            values = read_huffman_blob(f)
+            offsets = np.cumsum([0] + lengths)
+            encoded_planes = [values[offsets[i]:offsets[i + 1]] for i in range(plane_count)]
+        else:
+            encoded_planes = [read_encoded_values(length) for length in lengths]
+        
+        # Decode differences
+        def decode_channel(encoded_values, lzw):
+            decoded = lzw.decode_codes(encoded_values)
+            shifted = [ord(char) for char in decoded]
+            if use_rle:
+                shifted = rle_decode(shifted)
+            diff_values = np.array(shifted, dtype=np.int16) - 255
+            return unscan(diff_values[:self.width*self.height], (self.height, self.width), scan_order)
+        
+        diffs = [decode_channel(encoded_values, lzw)
+                 for encoded_values, lzw in zip(encoded_planes, self.coders)]
+        
+        # Restore original planes
+        if near:
+            planes = [restore_quantized(diff, near) for diff in diffs]
+        else:
+            planes = [self.restore_from_differences(diff) for diff in diffs]
+        
+        # Merge planes
+        restored_image = merge_planes(self.mode, planes, palette, color_transform)
+        
+        return restored_image
+
+    def calculate_statistics(self, diffs, encoded_planes):
+        channels = PLANE_NAMES[self.mode]
+        
         # Calculate entropy for each channel
-        for channel, arr in [("R", r_diff), ("G", g_diff), ("B", b_diff)]:
+        for channel, arr in zip(channels, diffs):
             values = arr.flatten() + 255  # Shift to positive range
             counts = np.bincount(values)
             probabilities = counts[counts > 0] / len(values)
@@ -201,17 +293,16 @@ class Level5Compressor:
         
         # Calculate average code length
         total_pixels = self.width * self.height
-        self.avg_code_length["R"] = len(r_encoded) * self.lzw_r.codelength / total_pixels
-        self.avg_code_length["G"] = len(g_encoded) * self.lzw_g.codelength / total_pixels
-        self.avg_code_length["B"] = len(b_encoded) * self.lzw_b.codelength / total_pixels
+        for channel, encoded, lzw in zip(channels, encoded_planes, self.coders):
+            self.avg_code_length[channel] = len(encoded) * lzw.codelength / total_pixels
         
         # Calculate compression ratio
-        total_compressed_bits = sum(len(x) * self.lzw_r.codelength for x in [r_encoded, g_encoded, b_encoded])
+        total_compressed_bits = sum(len(x) * self.lzw_r.codelength for x in encoded_planes)
         compressed_size = total_compressed_bits / 8
         self.compression_ratio = self.original_size / compressed_size
         
         print(f"\nLevel 5 Compression Statistics:")
-        for channel in ["R", "G", "B"]:
+        for channel in channels:
             print(f"{channel} Channel:")
             print(f"  Entropy: {self.entropy[channel]:.2f} bits/pixel")
             print(f"  Average Code Length: {self.avg_code_length[channel]:.2f} bits/pixel")
@@ -0,0 +1,273 @@
+import os
+import zlib
+from io import StringIO
+from itertools import repeat
+from LZW import LZWCoding
+
+# Multi-file archive. Many (small) files are stored in one archive instead of
+# one .bin file each, every member is LZW coded on its bytes like a Level 1 text
+# (the bytes are used as symbols 0..255).
+#
+# Members can be put in a named solid group: the first member of a group is its
+# primer and every other member of the group starts with the dictionary the
+# primer left behind (a warm dictionary) instead of the single symbols, so
+# similar small files do not have to learn the same phrases over and over. A
+# member only depends on its primer, so extracting it decodes at most two
+# members.
+#
+# File layout: b'LZWA', version (1 byte), the member codes (2 bytes each), the
+# central directory and the trailer. The central directory holds the member
+# count (4 bytes) and per member: name length (2 bytes), name (utf-8), group
+# length (1 byte), group (utf-8, empty for no group), code length (1 byte),
+# offset (8 bytes), number of codes (4 bytes), original size (8 bytes) and the
+# CRC-32 of the original bytes (4 bytes). The trailer is the offset of the
+# central directory (8 bytes) followed by b'LZWD'.
+# ------------------------------------------------------------------------------
+ARCHIVE_MAGIC = b'LZWA'
+DIRECTORY_MAGIC = b'LZWD'
+ARCHIVE_VERSION = 1
+
+# encoder dictionaries primed in this process, keyed by (code length, primer crc,
+# primer size), so a worker primes every group only once
+_primed_encoders = {}
+
+
+def primed_encoder(lzw, primer):
+    """Return a fresh copy of the encoder state (dictionary, dict_size) after the primer"""
+    if not primer:
+        return lzw.initial_dictionary(), lzw.initial_dict_size
+    key = (lzw.codelength, zlib.crc32(primer), len(primer))
+    if key not in _primed_encoders:
+        text = primer.decode('latin-1')
+        dictionary = lzw.initial_dictionary()
+        dict_size, w = lzw.encode_continue(text[1:], dictionary, lzw.initial_dict_size,
+                                           text[0], [])
+        _primed_encoders[key] = (dictionary, dict_size)
+    dictionary, dict_size = _primed_encoders[key]
+    return dict(dictionary), dict_size
+
+
+def encode_member(data, codelength, primer=None):
+    """LZW code the bytes of one member, starting from the primer's dictionary"""
+    if not data:
+        return []
+    lzw = LZWCoding('member', 'level1', codelength)
+    dictionary, dict_size = primed_encoder(lzw, primer)
+    text = data.decode('latin-1')
+    result = []
+    dict_size, w = lzw.encode_continue(text[1:], dictionary, dict_size, text[0], result)
+    result.append(dictionary[w])
+    return result
+
+
+def check_member_name(name):
+    """Reject member names that would be extracted outside the output directory"""
+    parts = name.replace('\\', '/').split('/')
+    if not name or os.path.isabs(name) or name.startswith(('/', '\\')) \
+            or os.path.splitdrive(name)[0] or '..' in parts:
+        raise ValueError(f"Invalid member name: {name!r}")
+
+
+class LZWArchive:
+    def __init__(self, path, codelength=12, max_workers=None):
+        self.path = path
+        self.codelength = codelength
+        self.max_workers = max_workers
+        self.members = []
+        # decoder state (dictionary, dict_size) of every group primer read so far
+        self.primed_decoders = {}
+        if os.path.exists(path):
+            self.read_directory()
+        else:
+            with open(path, 'wb') as f:
+                f.write(ARCHIVE_MAGIC)
+                f.write(ARCHIVE_VERSION.to_bytes(1, byteorder='big'))
+            self.directory_offset = len(ARCHIVE_MAGIC) + 1
+            self.write_directory()
+
+    def read_directory(self):
+        with open(self.path, 'rb') as f:
+            if f.read(len(ARCHIVE_MAGIC)) != ARCHIVE_MAGIC:
+                raise ValueError(f"Not an LZW archive: {self.path}")
+            version = int.from_bytes(f.read(1), byteorder='big')
+            if version != ARCHIVE_VERSION:
+                raise ValueError(f"Unsupported archive version: {version}")
+            f.seek(-12, os.SEEK_END)
+            self.directory_offset = int.from_bytes(f.read(8), byteorder='big')
+            if f.read(4) != DIRECTORY_MAGIC:
+                raise ValueError(f"Archive directory is missing: {self.path}")
+
+            f.seek(self.directory_offset)
+            count = int.from_bytes(f.read(4), byteorder='big')
+            self.members = []
+            for _ in range(count):
+                name = f.read(int.from_bytes(f.read(2), byteorder='big')).decode('utf-8')
+                group = f.read(int.from_bytes(f.read(1), byteorder='big')).decode('utf-8')
+                self.members.append({
+                    'name': name,
+                    'group': group or None,
+                    'codelength': int.from_bytes(f.read(1), byteorder='big'),
+                    'offset': int.from_bytes(f.read(8), byteorder='big'),
+                    'codes': int.from_bytes(f.read(4), byteorder='big'),
+                    'size': int.from_bytes(f.read(8), byteorder='big'),
+                    'crc': int.from_bytes(f.read(4), byteorder='big'),
+                })
+
+    def write_directory(self):
+        """Write the central directory and the trailer after the member codes"""
+        with open(self.path, 'r+b') as f:
+            f.seek(self.directory_offset)
+            f.write(len(self.members).to_bytes(4, byteorder='big'))
+            for member in self.members:
+                name = member['name'].encode('utf-8')
+                group = (member['group'] or '').encode('utf-8')
+                f.write(len(name).to_bytes(2, byteorder='big'))
+                f.write(name)
+                f.write(len(group).to_bytes(1, byteorder='big'))
+                f.write(group)
+                f.write(member['codelength'].to_bytes(1, byteorder='big'))
+                f.write(member['offset'].to_bytes(8, byteorder='big'))
+                f.write(member['codes'].to_bytes(4, byteorder='big'))
+                f.write(member['size'].to_bytes(8, byteorder='big'))
+                f.write(member['crc'].to_bytes(4, byteorder='big'))
+            f.write(self.directory_offset.to_bytes(8, byteorder='big'))
+            f.write(DIRECTORY_MAGIC)
+            f.truncate()
+
+    def list(self):
+        """Return the directory entries (name, group, size, compressed size, crc)"""
+        return [{'name': member['name'], 'group': member['group'],
+                 'size': member['size'], 'compressed_size': 2 * member['codes'],
+                 'crc': member['crc']} for member in self.members]
+
+    def find(self, name):
+        for member in self.members:
+            if member['name'] == name:
+                return member
+        raise KeyError(f"No member named {name} in {self.path}")
+
+    def group_primer(self, group):
+        """Return the primer member of a solid group (None for a new group)"""
+        if group is None:
+            return None
+        for member in self.members:
+            if member['group'] == group:
+                return member
+        return None
+
+    def add(self, file_path, arcname=None, group=None):
+        """Add one file, optionally to a solid group sharing a warm dictionary"""
+        self.add_many([file_path], [arcname] if arcname else None, group)
+
+    def add_many(self, file_paths, arcnames=None, group=None):
+        """Add several files, encoding them on a worker pool
+
+        When a new group is started, its first file is encoded here as the
+        primer and the remaining files are encoded in parallel from it.
+        """
+        if arcnames is None:
+            arcnames = [os.path.basename(path) for path in file_paths]
+        if len(arcnames) != len(file_paths):
+            raise ValueError("file_paths and arcnames must have the same length")
+        if group is not None and len(group.encode('utf-8')) > 255:
+            raise ValueError("Group names are limited to 255 bytes")
+        existing = {member['name'] for member in self.members}
+        for name in arcnames:
+            check_member_name(name)
+            if name in existing:
+                raise ValueError(f"Member {name} already exists in {self.path}")
+            existing.add(name)
+
+        contents = []
+        for path in file_paths:
+            with open(path, 'rb') as f:
+                contents.append(f.read())
+
+        encoded = []
+        primer = None
+        codelength = self.codelength
+        primer_member = self.group_primer(group)
+        if primer_member is not None:
+            primer = self.read_member(primer_member)
+            codelength = primer_member['codelength']
+        elif group is not None and contents:
+            # the first file of a new group is its primer (cold dictionary)
+            encoded.append(encode_member(contents[0], codelength))
+            primer = contents[0]
+
+        remaining = contents[len(encoded):]
+        if len(remaining) > 1 and self.max_workers != 1:
+            # imported here, so reading an archive does not pay for the pool
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+                encoded += list(pool.map(encode_member, remaining, repeat(codelength),
+                                         repeat(primer), chunksize=16))
+        else:
+            encoded += [encode_member(data, codelength, primer) for data in remaining]
+
+        with open(self.path, 'r+b') as f:
+            f.seek(self.directory_offset)
+            for name, data, codes in zip(arcnames, contents, encoded):
+                self.members.append({
+                    'name': name, 'group': group, 'codelength': codelength,
+                    'offset': f.tell(), 'codes': len(codes), 'size': len(data),
+                    'crc': zlib.crc32(data),
+                })
+                f.write(b''.join(code.to_bytes(2, byteorder='big') for code in codes))
+                print(f"Added {name}: {len(data):,} -> {2 * len(codes):,} bytes")
+            self.directory_offset = f.tell()
+        self.write_directory()
+
+    def read_codes(self, member):
+        with open(self.path, 'rb') as f:
+            f.seek(member['offset'])
+            data = f.read(2 * member['codes'])
+        return [int.from_bytes(data[i:i + 2], byteorder='big') for i in range(0, len(data), 2)]
+
+    def primed_decoder(self, member):
+        """Return a fresh copy of the decoder state a member starts from"""
+        lzw = LZWCoding('member', 'level1', member['codelength'])
+        dictionary = {i: chr(i) for i in range(lzw.initial_dict_size)}
+        dict_size = lzw.initial_dict_size
+        primer = self.group_primer(member['group'])
+        if primer is None or primer is member:
+            return lzw, dictionary, dict_size
+        if primer['name'] not in self.primed_decoders:
+            codes = self.read_codes(primer)
+            if codes:
+                dict_size = lzw.decode_continue(codes, dictionary, dict_size, StringIO())
+            self.primed_decoders[primer['name']] = (dictionary, dict_size)
+        dictionary, dict_size = self.primed_decoders[primer['name']]
+        return lzw, dict(dictionary), dict_size
+
+    def read_member(self, member):
+        """Decode one member and check its CRC-32"""
+        codes = self.read_codes(member)
+        lzw, dictionary, dict_size = self.primed_decoder(member)
+        result = StringIO()
+        if codes:
+            lzw.decode_continue(codes, dictionary, dict_size, result)
+        data = result.getvalue().encode('latin-1')
+        if len(data) != member['size'] or zlib.crc32(data) != member['crc']:
+            raise ValueError(f"Checksum mismatch for member {member['name']}")
+        return data
+
+    def extract(self, name, output_dir=None):
+        """Return the bytes of a member, also written to output_dir if given"""
+        data = self.read_member(self.find(name))
+        if output_dir is not None:
+            # the stored name comes from the archive file, which is not trusted
+            check_member_name(name)
+            output_path = os.path.join(output_dir, name)
+            root = os.path.realpath(output_dir)
+            if os.path.commonpath([root, os.path.realpath(output_path)]) != root:
+                raise ValueError(f"Member {name} would be extracted outside {output_dir}")
+            os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+            with open(output_path, 'wb') as f:
+                f.write(data)
+            print(f"Extracted {name} to {output_path}")
+        return data
+
+    def extract_all(self, output_dir):
+        for member in self.members:
+            self.extract(member['name'], output_dir)
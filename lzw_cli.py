@@ -0,0 +1,96 @@
+import argparse
+import os
+import sys
+import codec_registry
+
+# Headless command line entry point for codec_registry, meant for short lived
+# invocations (scripts, build steps). Files with an image suffix are compressed
+# as images (Levels 2-5), everything else as bytes (Level 1). Only the core
+# codec is imported at start-up, PIL and NumPy are imported by the image levels
+# when an image is actually compressed or restored.
+#
+#   python lzw_cli.py compress sample.txt            -> sample.txt.lzwm
+#   python lzw_cli.py compress photo.png --level 4   -> photo.png.lzwm
+#   python lzw_cli.py decompress sample.txt.lzwm     -> sample.txt
+# ------------------------------------------------------------------------------
+SUFFIX = '.lzwm'
+IMAGE_SUFFIXES = ('.bmp', '.png', '.gif', '.tif', '.tiff', '.jpg', '.jpeg', '.pgm', '.ppm')
+
+
+def read_source(path):
+    """Return the PIL image of an image file, the bytes of any other file"""
+    if path.lower().endswith(IMAGE_SUFFIXES):
+        from PIL import Image
+        img = Image.open(path)
+        img.load()
+        return img
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def restored_path(path, level):
+    """Output path of a decompressed file (images are saved as BMP, 16-bit ones as PNG)"""
+    base = path[:-len(SUFFIX)] if path.endswith(SUFFIX) else path + '.restored'
+    if level != 1 and not base.lower().endswith(IMAGE_SUFFIXES):
+        base += '.png' if level == 6 else '.bmp'
+    if os.path.exists(base):
+        root, extension = os.path.splitext(base)
+        base = f"{root}_restored{extension}"
+    return base
+
+
+def compress_file(path, output_path=None, level=None, **options):
+    source = read_source(path)
+    data = codec_registry.compress(source, level, **options)
+    output_path = output_path or path + SUFFIX
+    with open(output_path, 'wb') as f:
+        f.write(data)
+    print(f"{path} -> {output_path} (Level {data[len(codec_registry.MAGIC)]}, "
+          f"{os.path.getsize(path):,} -> {len(data):,} bytes)")
+    return output_path
+
+
+def decompress_file(path, output_path=None):
+    with open(path, 'rb') as f:
+        data = f.read()
+    restored = codec_registry.decompress(data, as_image=True)
+    level = data[len(codec_registry.MAGIC)]
+    output_path = output_path or restored_path(path, level)
+    if level == 1:
+        with open(output_path, 'wb') as f:
+            f.write(restored)
+    else:
+        restored.save(output_path)
+    print(f"{path} -> {output_path}")
+    return output_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="LZW compression without the GUI")
+    commands = parser.add_subparsers(dest='command', required=True)
+    compress_parser = commands.add_parser('compress', help="compress a file")
+    compress_parser.add_argument('input')
+    compress_parser.add_argument('-o', '--output')
+    compress_parser.add_argument('--level', type=int, choices=sorted(codec_registry.CODECS),
+                                 help="default: 1 for files, 3 for grayscale, 5 for colour and 6 for 16-bit images")
+    compress_parser.add_argument('--codelength', type=int)
+    compress_parser.add_argument('--entropy-coder', choices=('none', 'huffman'), default='none')
+    decompress_parser = commands.add_parser('decompress', help="restore a .lzwm file")
+    decompress_parser.add_argument('input')
+    decompress_parser.add_argument('-o', '--output')
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == 'compress':
+            compress_file(args.input, args.output, args.level, codelength=args.codelength,
+                          entropy_coder=args.entropy_coder)
+        else:
+            decompress_file(args.input, args.output)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,426 @@
+import struct
+from io import StringIO
+import numpy as np
+from PIL import Image
+from LZW import LZWCoding
+from image_compressor import ImageCompressor
+from level3_compressor import Level3Compressor
+from level4_compressor import Level4Compressor
+from level5_compressor import Level5Compressor
+
+# Export and import of standard LZW compressed TIFF and GIF files, so other
+# programs can read our images with their native decoders and we can read
+# theirs. The dictionary work is done by LZWCoding (encode_loop/decode_continue
+# with the two reserved codes), this module adds the rules of the formats:
+#
+#   clear code   2^n (256 for TIFF, 2^min_code_size for GIF), resets the table
+#   end code     clear + 1, the first new entry is clear + 2
+#   code width   starts at n + 1 bits and grows up to 12 bits; a code is written
+#                with the width of the largest code the decoder can expect at
+#                that point. TIFF switches one code earlier ("early change").
+#   table full   the encoder writes a clear code and starts a new table
+#   bit order    TIFF packs the codes MSB first, GIF LSB first in sub-blocks
+#
+# TIFF files are written with the horizontal differencing predictor (2), the
+# same left neighbour differences as Level 3/5 taken modulo 256 per sample.
+# ------------------------------------------------------------------------------
+MAX_CODE_WIDTH = 12
+# target size of an uncompressed TIFF strip (every strip is its own LZW stream)
+STRIP_SIZE = 65536
+
+TIFF_TYPES = {1: 'B', 2: 's', 3: 'H', 4: 'I', 5: 'II', 6: 'b', 8: 'h', 9: 'i'}
+TIFF_PHOTOMETRIC = {'L': 1, 'RGB': 2, 'RGBA': 2, 'P': 3}
+
+# our compressed files by suffix (longest first)
+COMPRESSED_SUFFIXES = [('.level3.compressed', Level3Compressor),
+                       ('.level4.compressed', Level4Compressor),
+                       ('.level5.compressed', Level5Compressor),
+                       ('.compressed', ImageCompressor)]
+
+
+def code_width(dict_size, early_change):
+    """Width of the next code when the encoder has dict_size entries"""
+    return min(MAX_CODE_WIDTH, (dict_size - 1 + early_change).bit_length())
+
+
+def interchange_coder(clear_code, max_dict_size):
+    lzw = LZWCoding(None, 'image')
+    lzw.initial_dict_size = clear_code
+    lzw.max_dict_size = max_dict_size
+    return lzw
+
+
+def lzw_encode_variable(data, min_code_size, early_change):
+    """LZW code the bytes with clear/end codes, return (codes, widths)"""
+    clear_code = 1 << min_code_size
+    first_code = clear_code + 2
+    # the table is full when the next entry would need a 13 bit code
+    max_dict_size = (1 << MAX_CODE_WIDTH) - early_change
+    lzw = interchange_coder(clear_code, max_dict_size)
+    text = bytes(data).decode('latin-1')
+
+    codes = [clear_code]
+    widths = [code_width(first_code, early_change)]
+    position = 0
+    while position < len(text):
+        # a new table after every clear code
+        dictionary = lzw.initial_dictionary()
+        dict_size = first_code
+        w = text[position]
+        position += 1
+        start = len(codes)
+        while position < len(text) and dict_size < max_dict_size:
+            # every symbol adds at most one entry, so a chunk cannot overfill the table
+            chunk = text[position:position + max_dict_size - dict_size]
+            dict_size, w = lzw.encode_loop(chunk, dictionary, dict_size, w, codes)
+            position += len(chunk)
+        codes.append(dictionary[w])
+        # the n-th code of a table is written when the encoder has first_code + n entries
+        widths.extend(code_width(first_code + n, early_change)
+                      for n in range(len(codes) - start + 1))
+        codes.append(clear_code if position < len(text) else clear_code + 1)
+    if len(codes) == 1:
+        codes.append(clear_code + 1)
+        widths.append(widths[0])
+    return codes, widths
+
+
+def pack_variable(codes, widths, msb_first):
+    """Pack codes of the given widths into bytes"""
+    codes = np.asarray(codes, dtype=np.uint32)
+    widths = np.asarray(widths, dtype=np.uint32)
+    ends = np.cumsum(widths)
+    starts = ends - widths
+    total = int(ends[-1]) if len(ends) else 0
+    out = np.zeros((total + 7) // 8 + 3, dtype=np.uint32)
+    offsets = (starts & 7).astype(np.uint32)
+    first_byte = (starts >> 3).astype(np.int64)
+    # every code lies in a window of 3 bytes, the bits of different codes never
+    # overlap, so the bytes can simply be added
+    if msb_first:
+        window = codes << (24 - offsets - widths)
+        for byte in range(3):
+            np.add.at(out, first_byte + byte, (window >> (16 - 8 * byte)) & 0xFF)
+    else:
+        window = codes << offsets
+        for byte in range(3):
+            np.add.at(out, first_byte + byte, (window >> (8 * byte)) & 0xFF)
+    return out[:(total + 7) // 8].astype(np.uint8).tobytes()
+
+
+def lzw_decode_variable(data, min_code_size, early_change, msb_first):
+    """Decode a TIFF/GIF LZW stream and return the bytes"""
+    clear_code = 1 << min_code_size
+    end_code = clear_code + 1
+    first_code = clear_code + 2
+    lzw = interchange_coder(clear_code, 1 << MAX_CODE_WIDTH)
+    result = []
+
+    def decode_table(codes):
+        if not codes:
+            return
+        if codes[0] >= clear_code:
+            raise ValueError(f"Invalid first code after a clear code: {codes[0]}")
+        decoded = StringIO()
+        try:
+            lzw.decode_continue(codes, {i: chr(i) for i in range(clear_code)}, first_code, decoded)
+        except KeyError as e:
+            raise ValueError(f"Invalid LZW code: {e}")
+        result.append(decoded.getvalue())
+
+    # read the codes of one table at a time (the widths depend on the position
+    # after the last clear code only) and decode them with LZWCoding
+    buffer = count = position = 0
+    codes = []
+    while True:
+        width = code_width(first_code + len(codes), early_change)
+        while count < width and position < len(data):
+            if msb_first:
+                buffer = (buffer << 8) | data[position]
+            else:
+                buffer |= data[position] << count
+            count += 8
+            position += 1
+        if count < width:
+            break  # some encoders leave out the end code
+        count -= width
+        if msb_first:
+            code = buffer >> count
+            buffer &= (1 << count) - 1
+        else:
+            code = buffer & ((1 << width) - 1)
+            buffer >>= width
+        if code == clear_code:
+            decode_table(codes)
+            codes = []
+        elif code == end_code:
+            break
+        else:
+            codes.append(code)
+    decode_table(codes)
+    return ''.join(result).encode('latin-1')
+
+
+# TIFF (baseline, one image, 8 bits per sample, chunky planar configuration)
+# ------------------------------------------------------------------------------
+def tiff_samples(img):
+    """Return (mode, samples as a H x W x C uint8 array, palette) for the TIFF"""
+    if img.mode == 'P' and 'transparency' not in img.info:
+        palette = (img.getpalette() or []) + [0] * 768
+        return 'P', np.array(img, dtype=np.uint8)[:, :, None], palette[:768]
+    if img.mode not in ('L', 'RGB', 'RGBA'):
+        img = img.convert('RGBA' if img.mode in ('LA', 'PA', 'P') else 'RGB')
+    samples = np.array(img, dtype=np.uint8)
+    if samples.ndim == 2:
+        samples = samples[:, :, None]
+    return img.mode, samples, None
+
+
+def export_tiff(img, path, predictor=True):
+    """Write an image as an LZW compressed TIFF file"""
+    mode, samples, palette = tiff_samples(img)
+    height, width, channels = samples.shape
+    # the predictor is not defined for palette indices
+    predictor = predictor and mode != 'P'
+    if predictor:
+        differences = samples.copy()
+        differences[:, 1:] = samples[:, 1:] - samples[:, :-1]
+        samples = differences
+    rows_per_strip = max(1, STRIP_SIZE // (width * channels))
+    strips = []
+    for row in range(0, height, rows_per_strip):
+        codes, widths = lzw_encode_variable(samples[row:row + rows_per_strip].tobytes(), 8, 1)
+        strips.append(pack_variable(codes, widths, msb_first=True))
+
+    # header, strips, then the IFD and the values that do not fit into it
+    offsets = []
+    position = 8
+    for strip in strips:
+        offsets.append(position)
+        position += len(strip) + (len(strip) & 1)
+    ifd_position = position
+    entries = [(256, 4, [width]), (257, 4, [height]), (258, 3, [8] * channels),
+               (259, 3, [5]), (262, 3, [TIFF_PHOTOMETRIC[mode]]), (273, 4, offsets),
+               (277, 3, [channels]), (278, 4, [rows_per_strip]),
+               (279, 4, [len(strip) for strip in strips]), (284, 3, [1]),
+               (317, 3, [2 if predictor else 1])]
+    if palette is not None:
+        entries.append((320, 3, [value * 257 for value in palette[0::3] + palette[1::3] + palette[2::3]]))
+    if mode == 'RGBA':
+        entries.append((338, 3, [2]))  # unassociated alpha
+    entries.sort()
+    extra_position = ifd_position + 2 + 12 * len(entries) + 4
+    ifd = struct.pack('<H', len(entries))
+    extra = b''
+    for tag, value_type, values in entries:
+        value = struct.pack(f'<{len(values)}{TIFF_TYPES[value_type]}', *values)
+        if len(value) <= 4:
+            ifd += struct.pack('<HHI', tag, value_type, len(values)) + value.ljust(4, b'\0')
+        else:
+            ifd += struct.pack('<HHII', tag, value_type, len(values), extra_position + len(extra))
+            extra += value + b'\0' * (len(value) & 1)
+    ifd += struct.pack('<I', 0)
+
+    with open(path, 'wb') as f:
+        f.write(b'II*\0' + struct.pack('<I', ifd_position))
+        for strip in strips:
+            f.write(strip + b'\0' * (len(strip) & 1))
+        f.write(ifd + extra)
+    print(f"TIFF file saved: {path}")
+
+
+def read_tiff_tags(data):
+    if data[:4] not in (b'II*\0', b'MM\0*'):
+        raise ValueError("Not a TIFF file")
+    order = '<' if data[:2] == b'II' else '>'
+    ifd_position, = struct.unpack(order + 'I', data[4:8])
+    count, = struct.unpack(order + 'H', data[ifd_position:ifd_position + 2])
+    tags = {}
+    for index in range(count):
+        entry = ifd_position + 2 + 12 * index
+        tag, value_type, length = struct.unpack(order + 'HHI', data[entry:entry + 8])
+        if value_type not in TIFF_TYPES or value_type == 2:
+            continue
+        value_format = TIFF_TYPES[value_type] * length
+        size = struct.calcsize(order + value_format)
+        if size <= 4:
+            position = entry + 8
+        else:
+            position, = struct.unpack(order + 'I', data[entry + 8:entry + 12])
+        tags[tag] = list(struct.unpack(order + value_format, data[position:position + size]))
+    return tags
+
+
+def import_tiff(path):
+    """Read an 8-bit TIFF file (uncompressed or LZW, predictor 1 or 2) as a PIL image"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    tags = read_tiff_tags(data)
+    width, height = tags[256][0], tags[257][0]
+    channels = tags.get(277, [1])[0]
+    compression = tags.get(259, [1])[0]
+    photometric = tags.get(262, [1])[0]
+    if set(tags.get(258, [1])) != {8} or tags.get(284, [1])[0] != 1:
+        raise ValueError("Only 8-bit chunky TIFF files are supported")
+    if compression not in (1, 5):
+        raise ValueError(f"Unsupported TIFF compression: {compression}")
+
+    pixels = b''
+    for offset, length in zip(tags[273], tags[279]):
+        strip = data[offset:offset + length]
+        if compression == 5:
+            if strip[:2] == b'\0\x01':
+                raise ValueError("Old-style (LSB first) TIFF LZW is not supported")
+            strip = lzw_decode_variable(strip, 8, 1, msb_first=True)
+        pixels += strip
+    samples = np.frombuffer(pixels[:width * height * channels], dtype=np.uint8)
+    samples = samples.reshape(height, width, channels)
+    if tags.get(317, [1])[0] == 2:
+        samples = np.cumsum(samples, axis=1, dtype=np.uint8)
+
+    if photometric == 3:
+        img = Image.fromarray(samples[:, :, 0], mode='P')
+        colormap = [value >> 8 for value in tags[320]]
+        size = len(colormap) // 3
+        img.putpalette([colormap[channel * size + index]
+                        for index in range(size) for channel in range(3)])
+        return img
+    if photometric == 0:
+        samples = 255 - samples  # WhiteIsZero
+    modes = {1: 'L', 2: 'LA', 3: 'RGB', 4: 'RGBA'}
+    if channels not in modes:
+        raise ValueError(f"Unsupported number of samples per pixel: {channels}")
+    if channels == 1:
+        return Image.fromarray(samples[:, :, 0], mode='L')
+    return Image.fromarray(np.ascontiguousarray(samples), mode=modes[channels])
+
+
+# GIF (GIF89a, palette images with up to 256 colours)
+# ------------------------------------------------------------------------------
+def gif_indices(img):
+    """Return (indices, palette, transparency) of a palette or grayscale image"""
+    if img.mode == 'P':
+        return np.array(img, dtype=np.uint8), img.getpalette() or [], img.info.get('transparency')
+    if img.mode == 'L':
+        return np.array(img, dtype=np.uint8), [value for value in range(256) for _ in range(3)], None
+    # colour images are stored losslessly if they have at most 256 colours
+    pixels = np.array(img.convert('RGB')).reshape(-1, 3)
+    colours, indices = np.unique(pixels, axis=0, return_inverse=True)
+    if len(colours) > 256:
+        raise ValueError("GIF stores at most 256 colours, convert the image to mode 'P' first")
+    return (indices.reshape(img.height, img.width).astype(np.uint8),
+            colours.astype(int).ravel().tolist(), None)
+
+
+def gif_sub_blocks(data):
+    return b''.join(bytes([len(data[i:i + 255])]) + data[i:i + 255]
+                    for i in range(0, len(data), 255)) + b'\0'
+
+
+def export_gif(img, path):
+    """Write a palette, grayscale or (at most 256 colour) RGB image as a GIF file"""
+    indices, palette, transparency = gif_indices(img)
+    height, width = indices.shape
+    colours = max(2, len(palette) // 3, int(indices.max()) + 1)
+    table_bits = max(1, (colours - 1).bit_length())
+    palette = (list(palette) + [0] * (3 << table_bits))[:3 << table_bits]
+    min_code_size = max(2, table_bits)
+    codes, widths = lzw_encode_variable(indices.tobytes(), min_code_size, 0)
+
+    with open(path, 'wb') as f:
+        f.write(b'GIF89a' + struct.pack('<HHBBB', width, height, 0xF0 | (table_bits - 1), 0, 0))
+        f.write(bytes(palette))
+        if isinstance(transparency, int):
+            f.write(b'\x21\xF9\x04' + struct.pack('<BHB', 1, 0, transparency) + b'\0')
+        f.write(b'\x2C' + struct.pack('<HHHHB', 0, 0, width, height, 0))
+        f.write(bytes([min_code_size]))
+        f.write(gif_sub_blocks(pack_variable(codes, widths, msb_first=False)))
+        f.write(b'\x3B')
+    print(f"GIF file saved: {path}")
+
+
+def import_gif(path):
+    """Read the first image of a GIF file as a PIL palette image"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:6] not in (b'GIF87a', b'GIF89a'):
+        raise ValueError("Not a GIF file")
+    screen_width, screen_height, flags, background, _ = struct.unpack('<HHBBB', data[6:13])
+    position = 13
+    palette = b''
+    if flags & 0x80:
+        palette = data[position:position + (3 << ((flags & 7) + 1))]
+        position += len(palette)
+    transparency = None
+
+    def skip_sub_blocks(position):
+        blocks = []
+        while data[position]:
+            blocks.append(data[position + 1:position + 1 + data[position]])
+            position += data[position] + 1
+        return b''.join(blocks), position + 1
+
+    while position < len(data):
+        block = data[position]
+        if block == 0x21:  # extension
+            label = data[position + 1]
+            content, position = skip_sub_blocks(position + 2)
+            if label == 0xF9 and content[0] & 1:
+                transparency = content[3]
+        elif block == 0x2C:  # image descriptor
+            left, top, width, height, image_flags = struct.unpack('<HHHHB', data[position + 1:position + 10])
+            position += 10
+            if image_flags & 0x80:
+                palette = data[position:position + (3 << ((image_flags & 7) + 1))]
+                position += len(palette)
+            min_code_size = data[position]
+            if not 2 <= min_code_size <= 8:
+                raise ValueError(f"Invalid LZW minimum code size: {min_code_size}")
+            content, position = skip_sub_blocks(position + 1)
+            pixels = lzw_decode_variable(content, min_code_size, 0, msb_first=False)
+            pixels = (pixels + bytes(width * height))[:width * height]
+            indices = np.frombuffer(pixels, dtype=np.uint8).reshape(height, width)
+            if image_flags & 0x40:
+                # interlaced: rows 0, 8, 16, ..., then 4, 12, ..., 2, 6, ... and 1, 3, ...
+                order = np.concatenate([np.arange(start, height, step) for start, step
+                                        in ((0, 8), (4, 8), (2, 4), (1, 2))])
+                deinterlaced = np.empty_like(indices)
+                deinterlaced[order] = indices
+                indices = deinterlaced
+            canvas = np.full((screen_height, screen_width), background, dtype=np.uint8)
+            canvas[top:top + height, left:left + width] = indices[:screen_height - top, :screen_width - left]
+            img = Image.fromarray(canvas, mode='P')
+            img.putpalette(palette)
+            if transparency is not None:
+                img.info['transparency'] = transparency
+            return img
+        elif block == 0x3B:  # trailer
+            break
+        else:
+            raise ValueError(f"Invalid GIF block: {block:#x}")
+    raise ValueError("The GIF file has no image")
+
+
+# Conversion between our compressed files and TIFF/GIF
+# ------------------------------------------------------------------------------
+def export_compressed(compressed_path, output_path, predictor=True):
+    """Restore one of our .compressed files and save it as .tif/.tiff or .gif"""
+    for suffix, compressor_class in COMPRESSED_SUFFIXES:
+        if compressed_path.endswith(suffix):
+            break
+    else:
+        raise ValueError(f"Unknown compressed file: {compressed_path}")
+    with open(compressed_path, 'rb') as f:
+        img = compressor_class(None).decompress_stream(f)
+    if output_path.lower().endswith('.gif'):
+        export_gif(img, output_path)
+    else:
+        export_tiff(img, output_path, predictor)
+    return img
+
+
+def import_image(path):
+    """Read a TIFF or GIF file with the decoders of this module"""
+    if path.lower().endswith('.gif'):
+        return import_gif(path)
+    return import_tiff(path)
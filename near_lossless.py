@@ -0,0 +1,56 @@
+import numpy as np
+
+# Near-lossless differencing for the differencing levels (Level 3 and 5). The
+# prediction is the same as in the lossless levels (left neighbour, upper
+# neighbour in the first column), but every difference is quantized JPEG-LS
+# style with a step of 2*near+1 and the prediction uses the reconstructed
+# pixels, so the error of every pixel is at most near and errors never
+# accumulate. With near=0 the quantized differences are the lossless ones.
+# ------------------------------------------------------------------------------
+
+
+def quantize(errors, near):
+    """Quantize prediction errors so that the reconstruction error is <= near"""
+    step = 2 * near + 1
+    return np.sign(errors) * ((np.abs(errors) + near) // step)
+
+
+def quantize_differences(plane, near):
+    """Return the quantized differences of a uint8 plane (int16, first value raw)"""
+    height, width = plane.shape
+    step = 2 * near + 1
+    pixels = plane.astype(np.int16)
+    quantized = np.zeros((height, width), dtype=np.int16)
+    reconstructed = np.zeros((height, width), dtype=np.int16)
+
+    # First pixel remains as is
+    quantized[0, 0] = reconstructed[0, 0] = pixels[0, 0]
+
+    # First column is predicted from the reconstructed pixel above
+    for i in range(1, height):
+        q = quantize(pixels[i, 0] - reconstructed[i - 1, 0], near)
+        quantized[i, 0] = q
+        reconstructed[i, 0] = np.clip(reconstructed[i - 1, 0] + q * step, 0, 255)
+
+    # Remaining columns are predicted from the reconstructed left neighbours,
+    # one column at a time for all rows at once
+    for j in range(1, width):
+        prediction = reconstructed[:, j - 1]
+        q = quantize(pixels[:, j] - prediction, near)
+        quantized[:, j] = q
+        reconstructed[:, j] = np.clip(prediction + q * step, 0, 255)
+
+    return quantized
+
+
+def restore_quantized(quantized, near):
+    """Rebuild the plane from quantize_differences output"""
+    height, width = quantized.shape
+    step = 2 * near + 1
+    reconstructed = np.zeros((height, width), dtype=np.int16)
+    reconstructed[0, 0] = quantized[0, 0]
+    for i in range(1, height):
+        reconstructed[i, 0] = np.clip(reconstructed[i - 1, 0] + quantized[i, 0] * step, 0, 255)
+    for j in range(1, width):
+        reconstructed[:, j] = np.clip(reconstructed[:, j - 1] + quantized[:, j] * step, 0, 255)
+    return reconstructed.astype(np.uint8)
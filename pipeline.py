@@ -0,0 +1,138 @@
+import struct
+import threading
+from queue import Queue, Empty, Full
+
+# Pipelined execution. Reading the input, LZW encoding and writing the codes run
+# as three stages in their own threads, connected by bounded queues, so the disk
+# and the CPU are busy at the same time (file I/O releases the GIL) and the end
+# to end time approaches max(I/O, CPU) instead of their sum. The codes of a
+# chunk are packed and written with one write call instead of one per code.
+# ------------------------------------------------------------------------------
+# number of symbols (or characters) per chunk
+PIPELINE_CHUNK = 65536
+# chunks buffered between two stages
+QUEUE_DEPTH = 4
+
+_END = object()
+
+
+def pack_codes(codes):
+    """Pack a list of codes into bytes (2 bytes each, big endian)"""
+    return struct.pack(f'>{len(codes)}H', *codes)
+
+
+def unpack_codes(data):
+    """Unpack bytes written by pack_codes into a list of codes"""
+    return list(struct.unpack(f'>{len(data) // 2}H', data[:len(data) // 2 * 2]))
+
+
+def run_pipeline(source, encode, write, depth=QUEUE_DEPTH):
+    """Run source -> encode -> write as three pipelined stages
+
+    source is an iterable of input chunks (consumed in the reader thread),
+    encode is a generator function that takes an iterable of chunks and yields
+    outputs (run in the encoder thread) and write is called with every output in
+    the calling thread. An exception in any stage stops the pipeline and is
+    raised again here.
+    """
+    inputs = Queue(maxsize=depth)
+    outputs = Queue(maxsize=depth)
+    errors = []
+    stop = threading.Event()
+
+    def put(q, item):
+        # give up when another stage failed, so no thread blocks forever
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    def drain(q):
+        while True:
+            try:
+                item = q.get(timeout=0.1)
+            except Empty:
+                if stop.is_set():
+                    return
+                continue
+            if item is _END:
+                return
+            yield item
+
+    def reader():
+        try:
+            for chunk in source:
+                if not put(inputs, chunk):
+                    return
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            put(inputs, _END)
+
+    def encoder():
+        try:
+            for output in encode(drain(inputs)):
+                if not put(outputs, output):
+                    return
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            put(outputs, _END)
+
+    threads = [threading.Thread(target=reader, daemon=True),
+               threading.Thread(target=encoder, daemon=True)]
+    for thread in threads:
+        thread.start()
+    try:
+        for output in drain(outputs):
+            write(output)
+    except BaseException:
+        stop.set()
+        raise
+    finally:
+        if errors:
+            stop.set()
+        for thread in threads:
+            thread.join()
+    if errors:
+        raise errors[0]
+
+
+def encode_planes(f, coders, symbol_planes, chunk_size=PIPELINE_CHUNK):
+    """Encode symbol planes with their LZW coders in a pipeline and write the codes
+
+    The codes of all planes are written one plane after the other at the current
+    position of f (2 bytes each). Returns the list of codes of every plane.
+    """
+    def source():
+        # the reader stage turns the symbols into the strings the coders use
+        for index, symbols in enumerate(symbol_planes):
+            for start in range(0, len(symbols), chunk_size):
+                yield index, ''.join([chr(x) for x in symbols[start:start + chunk_size]])
+
+    def encode(chunks):
+        index = state = None
+        for chunk_index, text in chunks:
+            if chunk_index != index:
+                if state is not None:
+                    yield index, coders[index].encode_flush(state)
+                index = chunk_index
+                state = coders[index].encode_start()
+            yield index, coders[index].encode_chunk(state, text)
+        if state is not None:
+            yield index, coders[index].encode_flush(state)
+
+    encoded_planes = [[] for _ in symbol_planes]
+
+    def write(output):
+        index, codes = output
+        encoded_planes[index].extend(codes)
+        f.write(pack_codes(codes))
+
+    run_pipeline(source(), encode, write)
+    return encoded_planes
@@ -0,0 +1,158 @@
+import numpy as np
+from PIL import Image
+import os
+from LZW import LZWCoding
+from image_modes import PLANE_NAMES, split_planes, merge_planes, write_mode_info, read_mode_info
+from pipeline import pack_codes
+from high_bit_depth_compressor import is_high_bit_depth
+
+# Progressive (multi-resolution) container. The image is stored as a pyramid:
+# first every 2^(levels-1)-th pixel of every row and column, then for each finer
+# resolution only the pixels that are new at that resolution, as residuals
+# (mod 256) against the coarser grid upsampled by pixel repetition. Every
+# resolution is LZW encoded as its own section, so a decoder can stop after any
+# section and still has a complete (smaller) image.
+#
+# File layout: width (4 bytes), height (4 bytes), mode info (see image_modes),
+# number of resolution levels (1 byte), code length (1 byte), then per level and
+# per plane the number of codes (4 bytes) followed by the codes (2 bytes each).
+# ------------------------------------------------------------------------------
+class ProgressiveCompressor:
+    def __init__(self, image_path, levels=4):
+        if not 1 <= levels <= 8:
+            raise ValueError("levels must be between 1 and 8")
+        self.image_path = image_path
+        self.levels = levels
+        self.lzw = LZWCoding(os.path.splitext(image_path)[0], 'level4')
+        self.coders = [self.lzw]
+        self.original_size = os.path.getsize(image_path)
+        self.width = None
+        self.height = None
+        self.mode = None
+        self.compression_ratio = None
+
+    @staticmethod
+    def new_pixel_mask(shape):
+        """Pixels of a grid that are not part of the next coarser grid"""
+        rows = np.arange(shape[0]) % 2 == 1
+        cols = np.arange(shape[1]) % 2 == 1
+        return rows[:, None] | cols[None, :]
+
+    @staticmethod
+    def upsample(coarse, shape):
+        """Predict a grid of the given shape by repeating the coarser pixels"""
+        return np.repeat(np.repeat(coarse, 2, axis=0), 2, axis=1)[:shape[0], :shape[1]]
+
+    def build_sections(self, plane):
+        """Split one plane into the coarse grid and the residuals of every level"""
+        step = 1 << (self.levels - 1)
+        coarse = plane[::step, ::step]
+        sections = [coarse.flatten()]
+        for level in range(self.levels - 2, -1, -1):
+            grid = plane[::1 << level, ::1 << level]
+            prediction = self.upsample(coarse, grid.shape)
+            residual = (grid.astype(np.int16) - prediction) & 0xFF
+            sections.append(residual[self.new_pixel_mask(grid.shape)].astype(np.uint8))
+            coarse = grid
+        return sections
+
+    def refine(self, coarse, values, level, width, height):
+        """Rebuild the grid of the given level from the coarser grid and residuals"""
+        shape = (len(range(0, height, 1 << level)), len(range(0, width, 1 << level)))
+        grid = self.upsample(coarse, shape).copy()
+        mask = self.new_pixel_mask(shape)
+        grid[mask] = (grid[mask].astype(np.int16) + values) & 0xFF
+        return grid
+
+    def compress(self):
+        print(f"Progressive - Compressing image: {self.image_path}")
+        try:
+            img = Image.open(self.image_path)
+            if is_high_bit_depth(img):
+                raise ValueError("16-bit images would be truncated, use HighBitDepthCompressor")
+            self.width, self.height = img.size
+            print(f"Image dimensions: {self.width}x{self.height}")
+
+            self.mode, planes, palette = split_planes(img, allow_grayscale=True)
+            print(f"Storage mode: {self.mode}, resolution levels: {self.levels}")
+
+            # sections[level][plane] holds the values of one resolution level
+            plane_sections = [self.build_sections(plane) for plane in planes]
+            sections = list(zip(*plane_sections))
+
+            output_path = f"{self.image_path}.progressive.compressed"
+            with open(output_path, 'wb') as f:
+                # Write metadata
+                f.write(self.width.to_bytes(4, byteorder='big'))
+                f.write(self.height.to_bytes(4, byteorder='big'))
+                write_mode_info(f, self.mode, palette)
+                f.write(self.levels.to_bytes(1, byteorder='big'))
+                f.write(self.lzw.codelength.to_bytes(1, byteorder='big'))
+
+                # Write every resolution level as its own section
+                for level_sections in sections:
+                    for values in level_sections:
+                        encoded_values = self.lzw.encode(''.join([chr(x) for x in values])) if len(values) else []
+                        f.write(len(encoded_values).to_bytes(4, byteorder='big'))
+                        f.write(pack_codes(encoded_values))
+
+            compressed_size = os.path.getsize(output_path)
+            self.compression_ratio = self.original_size / compressed_size
+            print(f"\nProgressive Compression Statistics:")
+            print(f"Original Size: {self.original_size:,} bytes")
+            print(f"Compressed Size: {compressed_size:,} bytes")
+            print(f"Compression Ratio: {self.compression_ratio:.2f}")
+            return output_path
+
+        except Exception as e:
+            print(f"Error during progressive compression: {str(e)}")
+            raise e
+
+    def iter_levels(self, compressed_file_path):
+        """Yield (level, image) from the coarsest to the full resolution
+
+        Each image is available as soon as its section is decoded, so callers
+        can display a thumbnail early and stop iterating at any resolution.
+        """
+        with open(compressed_file_path, 'rb') as f:
+            self.width = int.from_bytes(f.read(4), byteorder='big')
+            self.height = int.from_bytes(f.read(4), byteorder='big')
+            self.mode, palette = read_mode_info(f)
+            self.levels = int.from_bytes(f.read(1), byteorder='big')
+            self.lzw.set_codelength(int.from_bytes(f.read(1), byteorder='big'))
+            plane_count = len(PLANE_NAMES[self.mode])
+
+            def read_section():
+                length = int.from_bytes(f.read(4), byteorder='big')
+                encoded_values = np.frombuffer(f.read(2 * length), dtype='>u2').tolist()
+                decoded = self.lzw.decode_codes(encoded_values)
+                return np.array([ord(c) for c in decoded], dtype=np.uint8)
+
+            step = 1 << (self.levels - 1)
+            shape = (len(range(0, self.height, step)), len(range(0, self.width, step)))
+            grids = [read_section().reshape(shape) for _ in range(plane_count)]
+            yield self.levels - 1, merge_planes(self.mode, grids, palette)
+
+            for level in range(self.levels - 2, -1, -1):
+                grids = [self.refine(grid, read_section(), level, self.width, self.height)
+                         for grid in grids]
+                yield level, merge_planes(self.mode, grids, palette)
+
+    def decompress(self, compressed_file_path, max_level=0):
+        """Decode up to the given level (0 is full resolution, 1 is half, ...)"""
+        print(f"Progressive - Decompressing file: {compressed_file_path}")
+        try:
+            for level, restored_image in self.iter_levels(compressed_file_path):
+                if level <= max_level:
+                    break
+            print(f"Decoded resolution: {restored_image.size[0]}x{restored_image.size[1]}")
+
+            if level == 0:
+                output_path = compressed_file_path.replace('.progressive.compressed', '_progressive_restored.bmp')
+                restored_image.save(output_path, format='BMP')
+                print(f"Restored image saved: {output_path}")
+            return restored_image
+
+        except Exception as e:
+            print(f"Error during progressive decompression: {str(e)}")
+            raise e
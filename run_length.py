@@ -0,0 +1,113 @@
+import numpy as np
+
+# Optional run-length pre-pass for the image levels. LZW needs many codes to
+# cover a long run of one symbol because every phrase grows by one symbol only,
+# so flat images (logos, UI captures) are first run-length coded:
+#
+#   a run of length L >= 2 of symbol s  ->  s, s, L - 2   (L <= MAX_RUN)
+#   a single symbol s                   ->  s
+#
+# Longer runs are split into several runs of at most MAX_RUN symbols. The count
+# always fits in a byte, so the tokens stay inside the alphabet of every level.
+# ------------------------------------------------------------------------------
+MAX_RUN = 257
+# the pre-pass is enabled automatically when it removes at least this fraction
+# of the symbols
+AUTO_THRESHOLD = 0.2
+# number of symbols per plane the auto-detection encodes to compare both variants
+AUTO_SAMPLE_SIZE = 65536
+RUN_LENGTH_MODES = ('off', 'on', 'auto')
+
+
+def find_runs(symbols):
+    """Return the symbol and length of every run (vectorized)"""
+    symbols = np.asarray(symbols)
+    if symbols.size == 0:
+        return symbols, np.zeros(0, dtype=np.int64)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(symbols)) + 1))
+    lengths = np.diff(np.concatenate((starts, [symbols.size])))
+    return symbols[starts], lengths
+
+
+def rle_encode(symbols):
+    """Run-length code a 1-D array of symbols and return the token array"""
+    run_symbols, run_lengths = find_runs(symbols)
+    if run_lengths.size == 0:
+        return np.zeros(0, dtype=np.int32)
+
+    # split long runs into chunks of at most MAX_RUN symbols
+    chunk_counts = (run_lengths + MAX_RUN - 1) // MAX_RUN
+    chunk_symbols = np.repeat(run_symbols, chunk_counts)
+    chunk_lengths = np.full(chunk_symbols.size, MAX_RUN, dtype=np.int64)
+    last_chunks = np.cumsum(chunk_counts) - 1
+    chunk_lengths[last_chunks] = run_lengths - MAX_RUN * (chunk_counts - 1)
+
+    # a chunk becomes 3 tokens (s, s, count) or 1 token (s)
+    repeated = chunk_lengths >= 2
+    token_lengths = np.where(repeated, 3, 1)
+    offsets = np.cumsum(token_lengths) - token_lengths
+    tokens = np.empty(int(token_lengths.sum()), dtype=np.int32)
+    tokens[offsets] = chunk_symbols
+    tokens[offsets[repeated] + 1] = chunk_symbols[repeated]
+    tokens[offsets[repeated] + 2] = chunk_lengths[repeated] - 2
+    return tokens
+
+
+def rle_decode(tokens):
+    """Undo rle_encode and return the 1-D array of symbols"""
+    tokens = [int(t) for t in tokens]
+    run_symbols = []
+    run_lengths = []
+    i = 0
+    while i < len(tokens):
+        symbol = tokens[i]
+        if i + 1 < len(tokens) and tokens[i + 1] == symbol:
+            run_symbols.append(symbol)
+            run_lengths.append(tokens[i + 2] + 2)
+            i += 3
+        else:
+            run_symbols.append(symbol)
+            run_lengths.append(1)
+            i += 1
+    return np.repeat(np.array(run_symbols, dtype=np.int32), run_lengths)
+
+
+def token_count(symbols):
+    """Number of tokens rle_encode would produce, without building them"""
+    run_symbols, run_lengths = find_runs(symbols)
+    full_chunks, rest = np.divmod(run_lengths, MAX_RUN)
+    return int(3 * full_chunks.sum() + np.where(rest >= 2, 3, rest).sum())
+
+
+def use_run_length(planes, lzw=None):
+    """Auto-detect heuristic: enable the pre-pass for images with long runs
+
+    The pre-pass has to remove at least AUTO_THRESHOLD of the symbols. When an
+    LZW coder is given, a sample of every plane is also encoded with and
+    without the pre-pass and it is only enabled if it saves codes (for
+    difference images LZW often handles the runs well enough on its own).
+    """
+    planes = [np.asarray(plane).ravel() for plane in planes]
+    symbols = sum(plane.size for plane in planes)
+    tokens = sum(token_count(plane) for plane in planes)
+    if symbols == 0 or tokens > (1 - AUTO_THRESHOLD) * symbols:
+        return False
+    if lzw is None:
+        return True
+    # a contiguous sample from the middle of every plane
+    plain_codes = rle_codes = 0
+    for plane in planes:
+        start = max(0, (plane.size - AUTO_SAMPLE_SIZE) // 2)
+        sample = plane[start:start + AUTO_SAMPLE_SIZE]
+        plain_codes += len(lzw.encode(''.join([chr(x) for x in sample])))
+        rle_codes += len(lzw.encode(''.join([chr(x) for x in rle_encode(sample)])))
+    return rle_codes < plain_codes
+
+
+def resolve_run_length(mode, planes, lzw=None):
+    """Decide whether the pre-pass is applied for a run_length option"""
+    if mode not in RUN_LENGTH_MODES:
+        raise ValueError(f"Unknown run-length mode: {mode}")
+    if mode == 'auto':
+        return use_run_length(planes, lzw)
+    return mode == 'on'
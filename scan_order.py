@@ -0,0 +1,85 @@
+from functools import lru_cache
+import numpy as np
+
+# Scan orders for the image levels. The pixels (or differences) of a plane are
+# flattened in one of these orders before LZW coding:
+#
+#   row         row-major, the original order
+#   serpentine  row-major, every second row right to left, so the context does
+#               not break at the end of a row
+#   column      column-major, follows vertical structure
+#   hilbert     Hilbert curve inside tiles of HILBERT_TILE x HILBERT_TILE pixels,
+#               the tiles in row-major order (keeps 2-D neighbours close)
+#
+# The order is stored in the header as one byte. The permutations are computed
+# once per image size with NumPy and cached.
+# ------------------------------------------------------------------------------
+SCAN_ORDERS = {'row': 0, 'serpentine': 1, 'column': 2, 'hilbert': 3}
+HILBERT_TILE = 32
+
+
+def scan_order_name(code):
+    for name, value in SCAN_ORDERS.items():
+        if value == code:
+            return name
+    raise ValueError(f"Unknown scan order code: {code}")
+
+
+def hilbert_curve(n):
+    """Return the (x, y) coordinates of the n x n Hilbert curve (n a power of 2)"""
+    t = np.arange(n * n)
+    x = np.zeros(n * n, dtype=np.int64)
+    y = np.zeros(n * n, dtype=np.int64)
+    s = 1
+    while s < n:
+        rx = (t // 2) & 1
+        ry = (t ^ rx) & 1
+        # rotate the quadrant
+        flip = (ry == 0) & (rx == 1)
+        x[flip] = s - 1 - x[flip]
+        y[flip] = s - 1 - y[flip]
+        swap = ry == 0
+        x[swap], y[swap] = y[swap], x[swap].copy()
+        x += s * rx
+        y += s * ry
+        t //= 4
+        s *= 2
+    return x, y
+
+
+@lru_cache(maxsize=32)
+def scan_indices(height, width, order):
+    """Flat (row-major) pixel indices in scan order (cached, do not modify)"""
+    if order not in SCAN_ORDERS:
+        raise ValueError(f"Unknown scan order: {order}")
+    indices = np.arange(height * width).reshape(height, width)
+    if order == 'serpentine':
+        indices[1::2] = indices[1::2, ::-1]
+    elif order == 'column':
+        indices = indices.T
+    elif order == 'hilbert':
+        x, y = hilbert_curve(HILBERT_TILE)
+        tile_rows = np.arange(0, height, HILBERT_TILE)
+        tile_cols = np.arange(0, width, HILBERT_TILE)
+        rows = (tile_rows[:, None, None] + y[None, None, :]).repeat(len(tile_cols), axis=1)
+        cols = (tile_cols[None, :, None] + x[None, None, :]).repeat(len(tile_rows), axis=0)
+        inside = (rows < height) & (cols < width)
+        return rows[inside] * width + cols[inside]
+    return indices.ravel()
+
+
+def scan(plane, order):
+    """Flatten a 2-D plane in the given scan order"""
+    if order == 'row':
+        return plane.flatten()
+    return plane.ravel()[scan_indices(*plane.shape, order)]
+
+
+def unscan(values, shape, order):
+    """Undo scan: rebuild the 2-D plane from the values in scan order"""
+    values = np.asarray(values)
+    if order == 'row':
+        return values.reshape(shape)
+    plane = np.empty(shape[0] * shape[1], dtype=values.dtype)
+    plane[scan_indices(*shape, order)] = values
+    return plane.reshape(shape)
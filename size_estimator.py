@@ -0,0 +1,182 @@
+import math
+import os
+import numpy as np
+from PIL import Image
+from LZW import LZWCoding, COUNT_OFFSET
+from image_modes import split_planes
+from high_bit_depth_compressor import is_high_bit_depth, sample_array, wrapped_differences
+import high_bit_depth_compressor
+import image_compressor
+import level3_compressor
+import level4_compressor
+import level5_compressor
+import codec_registry
+
+# Compressed size estimates without writing any output. The LZW dictionary of a
+# level fills up at the start of a plane and stays frozen afterwards, so:
+#
+#   1. the start of every plane is encoded until the dictionary is full (these
+#      codes are exact, a short input is encoded completely),
+#   2. evenly spaced regions covering sample_fraction of the rest are parsed
+#      with the frozen dictionary, only counting the codes
+#      (LZWCoding.count_codes), and the codes per symbol are extrapolated.
+#
+# The spread of the codes per symbol between the regions gives the confidence
+# band (normal approximation with the finite population correction). Codes are
+# counted at 2 bytes each (entropy_coder='none') plus the header of the level;
+# the default options of the levels are assumed (row scan, no run-length pass,
+# differencing for Level 6).
+# ------------------------------------------------------------------------------
+LZW_TYPES = {1: 'level1', 2: 'level2', 3: 'level3', 4: 'level4', 5: 'level5', 6: 'level4'}
+# z value of the two-sided 95% confidence band
+CONFIDENCE_Z = 1.96
+# symbols encoded at a time while the dictionary fills up
+WARMUP_CHUNK = 4096
+
+
+def load_source(source):
+    """Return (level 1 text or PIL image, original size in bytes)"""
+    if isinstance(source, str) and os.path.isfile(source):
+        original_size = os.path.getsize(source)
+        if source.lower().endswith('.txt'):
+            with open(source, 'r', encoding='utf-8') as f:
+                return f.read(), original_size
+        img = Image.open(source)
+        img.load()
+        return img, original_size
+    if isinstance(source, (bytes, bytearray, str)):
+        if isinstance(source, str):
+            source = source.encode('utf-8')
+        return bytes(source).decode('latin-1'), len(source)
+    img = codec_registry.to_image(source)
+    sample_size = 2 if is_high_bit_depth(img) else 1
+    return img, img.width * img.height * len(img.getbands()) * sample_size
+
+
+def difference_symbols(plane):
+    """Level 3/5 differences (left neighbour, above for the first column) in [0, 511]"""
+    plane = plane.astype(np.int32)
+    diffs = plane.copy()
+    diffs[:, 1:] = plane[:, 1:] - plane[:, :-1]
+    diffs[1:, 0] = plane[1:, 0] - plane[:-1, 0]
+    return (diffs + 255) & 0x1FF
+
+
+def symbol_planes(data, level, color_transform='none'):
+    """Return (the symbols every coder of the level encodes, header size in bytes)"""
+    if level == 1:
+        # the .bin header ends with the number of codes (4 bytes)
+        return [data], COUNT_OFFSET + 4
+    if level == 6:
+        # high and low byte plane of the zigzag mapped 16-bit differences
+        values = wrapped_differences(sample_array(data))
+        planes = [(values >> 8).astype(np.uint8), (values & 0xFF).astype(np.uint8)]
+        return [plane.ravel() for plane in planes], high_bit_depth_compressor.HEADER_SIZE
+    if level in (2, 3):
+        planes = [np.array(data.convert('L'))]
+        header = image_compressor.HEADER_SIZE if level == 2 else level3_compressor.HEADER_SIZE
+    else:
+        mode, planes, palette = split_planes(data, color_transform)
+        mode_info = 1 + (2 + len(palette) if mode == 'P' else 0)
+        # Level 5 also stores the first pixel of every plane
+        if level == 4:
+            header = level4_compressor.HEADER_SIZE + mode_info + 4 * len(planes)
+        else:
+            header = level5_compressor.HEADER_SIZE + mode_info + 5 * len(planes)
+    if level in (3, 5):
+        planes = [difference_symbols(plane) for plane in planes]
+    return [plane.ravel() for plane in planes], header
+
+
+def to_string(symbols):
+    if isinstance(symbols, str):
+        return symbols
+    return ''.join(map(chr, symbols.tolist()))
+
+
+def warm_up(lzw, symbols):
+    """Encode the start of the symbols until the dictionary is full
+
+    Returns (codes, symbols consumed, dictionary); the pending prefix counts as
+    one more code when all symbols were consumed.
+    """
+    dictionary = lzw.initial_dictionary()
+    dict_size = lzw.initial_dict_size
+    result = []
+    w = to_string(symbols[:1])
+    position = 1
+    while position < len(symbols) and dict_size < lzw.max_dict_size:
+        chunk = to_string(symbols[position:position + WARMUP_CHUNK])
+        dict_size, w = lzw.encode_loop(chunk, dictionary, dict_size, w, result)
+        position += len(chunk)
+    # the region parsing below starts fresh, so the pending prefix is emitted
+    return len(result) + 1, position, dictionary
+
+
+def estimate(source, level=None, sample_fraction=0.1, codelength=None,
+             color_transform='none', regions=8):
+    """Estimate the compressed size of a file, bytes/str or image for a level
+
+    Returns a dict with the estimated size and its 95% confidence band (low,
+    high) in bytes, the estimated ratio, the original size and the fraction of
+    the symbols that was actually encoded.
+    """
+    if not 0 < sample_fraction <= 1:
+        raise ValueError("sample_fraction must be in (0, 1]")
+    data, original_size = load_source(source)
+    if level is None:
+        level = 1 if isinstance(data, str) else codec_registry.default_level(data)
+    if level not in LZW_TYPES:
+        raise ValueError(f"Unknown level: {level}")
+    if (level == 1) != isinstance(data, str):
+        raise ValueError("Level 1 estimates text, Levels 2-6 estimate images")
+    lzw = LZWCoding('estimate', LZW_TYPES[level], codelength)
+
+    planes, header = symbol_planes(data, level, color_transform)
+    exact_codes = 0
+    rest_symbols = encoded_symbols = 0
+    region_codes = [0] * regions
+    region_symbols = [0] * regions
+    for symbols in planes:
+        if not len(symbols):
+            continue
+        codes, position, dictionary = warm_up(lzw, symbols)
+        exact_codes += codes
+        encoded_symbols += position
+        rest = len(symbols) - position
+        if rest <= 0:
+            continue
+        # evenly spaced regions of the rest, parsed with the frozen dictionary
+        rest_symbols += rest
+        length = max(1, min(rest // regions, math.ceil(rest * sample_fraction / regions)))
+        starts = np.linspace(position, len(symbols) - length, regions).astype(int)
+        for index, start in enumerate(starts):
+            region = to_string(symbols[start:start + length])
+            region_codes[index] += lzw.count_codes(region, dictionary)
+            region_symbols[index] += len(region)
+            encoded_symbols += len(region)
+
+    # extrapolate the codes per symbol of the regions to the rest
+    rate = spread = 0.0
+    if rest_symbols:
+        rates = [codes / symbols for codes, symbols in zip(region_codes, region_symbols) if symbols]
+        rate = sum(region_codes) / sum(region_symbols)
+        fraction = min(1.0, sum(region_symbols) / rest_symbols)
+        if len(rates) > 1:
+            spread = (CONFIDENCE_Z * float(np.std(rates, ddof=1)) / math.sqrt(len(rates))
+                      * math.sqrt(1 - fraction))
+    total_symbols = sum(len(symbols) for symbols in planes)
+
+    def size_for(codes_per_symbol):
+        return int(round(header + 2 * (exact_codes + codes_per_symbol * rest_symbols)))
+
+    size = size_for(rate)
+    return {
+        'level': level,
+        'size': size,
+        'low': size_for(max(rate - spread, 0.0)),
+        'high': size_for(rate + spread),
+        'ratio': original_size / size,
+        'original_size': original_size,
+        'sampled_fraction': encoded_symbols / total_symbols if total_symbols else 1.0,
+    }
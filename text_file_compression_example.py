@@ -1,4 +1,4 @@
-from image_operations_and_gui.LZW import LZWCoding
+from LZW import LZWCoding
 
 # read and compress the file sample.txt
 filename = 'sample'
@@ -1,5 +1,5 @@
 import os  # the os module is used for file and directory operations
-from image_operations_and_gui.LZW import LZWCoding
+from LZW import LZWCoding
 
 # read and decompress the file sample.bin
 filename = 'sample'
@@ -14,7 +14,7 @@ current_directory = os.path.dirname(os.path.realpath(__file__))
 original_file = filename + '.txt'
 original_path = current_directory + '/' + original_file
 # build the path of the decompressed file
-decompressed_file = filename + '_decompressed.txt'
+decompressed_file = filename + '_restored.txt'
 decompressed_path = current_directory + '/' + decompressed_file
 # read the contents of both files
 with open(original_path, 'r') as file1, open(decompressed_path, 'r') as file2:
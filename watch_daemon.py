@@ -0,0 +1,301 @@
+import argparse
+import json
+import os
+import signal
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import codec_registry
+from lzw_cli import SUFFIX, read_source
+from high_bit_depth_compressor import is_high_bit_depth
+
+# Watch-folder daemon. The watched directories are polled (os.scandir, so it
+# works on every platform and on network shares), new and changed files are
+# queued and compressed on a bounded process pool into the codec_registry
+# format (<file>.lzwm, restored with lzw_cli.py decompress). A file is queued
+# once its size and modification time are the same in two successive polls, so
+# files that are still being written are not picked up half way.
+#
+# Routing: files with an image suffix go to Level 3 (grayscale), Level 6 (16-bit
+# grayscale) or Level 5 (colour, palette and alpha images), all other files to
+# Level 1.
+#
+# Journal: every queued, compressed and failed file is appended to a JSON lines
+# file (path, size, mtime_ns, ...). On start the journal is replayed: files that
+# were compressed and have not changed since are skipped, files that were
+# queued but not finished are queued again right away. The journal is
+# compacted to the latest entry per file on start.
+#
+# Counters: stats() returns the backlog (settling, queued and running files),
+# the totals and the throughput over the last THROUGHPUT_WINDOW seconds; with
+# status_path they are also written to a JSON file after every poll.
+# ------------------------------------------------------------------------------
+JOURNAL_NAME = '.lzw_journal.jsonl'
+# seconds of completed jobs the throughput is measured over
+THROUGHPUT_WINDOW = 60.0
+GRAYSCALE_MODES = ('1', 'L')
+
+
+def route_level(source):
+    """Level 1 for bytes, Level 3/6 for 8/16-bit grayscale and Level 5 for other images"""
+    if isinstance(source, (bytes, bytearray)):
+        return 1
+    if is_high_bit_depth(source):
+        return 6
+    return 3 if source.mode in GRAYSCALE_MODES else 5
+
+
+def compress_job(path, output_path):
+    """Compress one file in a worker process and return (level, original size, compressed size)"""
+    source = read_source(path)
+    level = route_level(source)
+    if level == 3 and source.mode != 'L':
+        source = source.convert('L')
+    data = codec_registry.compress(source, level)
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    # written next to the output and renamed, so readers never see a partial file
+    temp_path = output_path + '.part'
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, output_path)
+    return level, os.path.getsize(path), len(data)
+
+
+class WatchDaemon:
+    def __init__(self, directories, output_dir=None, journal_path=None, max_workers=None,
+                 max_pending=None, poll_interval=1.0, status_path=None):
+        if not directories:
+            raise ValueError("At least one directory must be watched")
+        if poll_interval <= 0:
+            raise ValueError("poll_interval must be positive")
+        self.directories = [os.path.abspath(directory) for directory in directories]
+        for directory in self.directories:
+            if not os.path.isdir(directory):
+                raise ValueError(f"Not a directory: {directory}")
+        self.output_dir = os.path.abspath(output_dir) if output_dir else None
+        self.journal_path = os.path.abspath(journal_path or os.path.join(self.directories[0], JOURNAL_NAME))
+        self.max_workers = max_workers or os.cpu_count() or 1
+        # jobs submitted to the pool at a time, the rest waits in the queue
+        self.max_pending = max_pending or 2 * self.max_workers
+        self.poll_interval = poll_interval
+        self.status_path = os.path.abspath(status_path) if status_path else None
+        self.stop_event = threading.Event()
+        self.pool = None
+        self.journal = None
+        self.done = {}       # path -> (size, mtime_ns) of its last compression or failure
+        self.settling = {}   # path -> (size, mtime_ns) seen in the last poll
+        self.queue = deque()
+        self.queued = {}     # path -> (size, mtime_ns) waiting in the queue
+        self.running = {}    # future -> (path, (size, mtime_ns), start time)
+        self.recent = deque()  # (finish time, original bytes) of the recent jobs
+        self.started = None
+        self.completed = 0
+        self.failed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.levels = {1: 0, 3: 0, 5: 0, 6: 0}
+
+    # The journal: one JSON object per line, the latest line of a path wins.
+    # ---------------------------------------------------------------------------
+    def load_journal(self):
+        latest = {}
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # a line cut short by a crash
+                        continue
+                    latest[entry['path']] = entry
+        resumed = 0
+        for path, entry in latest.items():
+            signature = (entry['size'], entry['mtime_ns'])
+            if entry['event'] in ('done', 'failed'):
+                self.done[path] = signature
+            elif entry['event'] == 'queued' and os.path.isfile(path):
+                self.enqueue(path, signature, journal=False)
+                resumed += 1
+        # compact the journal to the latest entry per file
+        temp_path = self.journal_path + '.part'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            for entry in latest.values():
+                f.write(json.dumps(entry) + '\n')
+        os.replace(temp_path, self.journal_path)
+        self.journal = open(self.journal_path, 'a', encoding='utf-8')
+        if resumed:
+            print(f"Watch daemon: resuming {resumed} unfinished files from {self.journal_path}")
+
+    def write_journal(self, event, path, signature, **fields):
+        entry = dict(event=event, path=path, size=signature[0], mtime_ns=signature[1], **fields)
+        self.journal.write(json.dumps(entry) + '\n')
+        self.journal.flush()
+
+    # Polling
+    # ---------------------------------------------------------------------------
+    def output_path(self, path):
+        if self.output_dir is None:
+            return path + SUFFIX
+        for directory in self.directories:
+            if os.path.commonpath([directory, path]) == directory:
+                relative_path = os.path.relpath(path, directory)
+                return os.path.join(self.output_dir, os.path.basename(directory), relative_path + SUFFIX)
+        return os.path.join(self.output_dir, os.path.basename(path) + SUFFIX)
+
+    def ignored(self, entry):
+        """Outputs, temporary files, hidden files and the daemon's own files are not compressed"""
+        return (entry.name.startswith('.') or entry.name.endswith((SUFFIX, '.part'))
+                or entry.path in (self.journal_path, self.status_path))
+
+    def scan(self, directory):
+        """Yield (path, (size, mtime_ns)) of the files below a directory"""
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            return
+        for entry in entries:
+            if self.ignored(entry):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if self.output_dir is None or entry.path != self.output_dir:
+                        yield from self.scan(entry.path)
+                elif entry.is_file():
+                    stat = entry.stat()
+                    yield entry.path, (stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                # removed while scanning
+                continue
+
+    def poll(self):
+        """Scan the directories once and queue the files that settled"""
+        seen = {}
+        # a file changed while it is compressed is picked up after the job
+        busy = {path for path, _, _ in self.running.values()}
+        for directory in self.directories:
+            for path, signature in self.scan(directory):
+                if self.done.get(path) == signature or path in self.queued or path in busy:
+                    continue
+                if self.settling.get(path) == signature:
+                    self.enqueue(path, signature)
+                else:
+                    seen[path] = signature
+        self.settling = seen
+
+    def enqueue(self, path, signature, journal=True):
+        self.queue.append(path)
+        self.queued[path] = signature
+        if journal:
+            self.write_journal('queued', path, signature)
+
+    # The worker pool
+    # ---------------------------------------------------------------------------
+    def submit_jobs(self):
+        while self.queue and len(self.running) < self.max_pending:
+            path = self.queue.popleft()
+            signature = self.queued.pop(path)
+            future = self.pool.submit(compress_job, path, self.output_path(path))
+            self.running[future] = (path, signature, time.perf_counter())
+
+    def collect(self, timeout):
+        """Wait up to timeout seconds for running jobs and record the finished ones"""
+        if not self.running:
+            self.stop_event.wait(timeout)
+            return
+        finished, _ = wait(list(self.running), timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in finished:
+            path, signature, start = self.running.pop(future)
+            self.done[path] = signature
+            try:
+                level, original_size, compressed_size = future.result()
+            except Exception as e:
+                self.failed += 1
+                self.write_journal('failed', path, signature, error=str(e))
+                print(f"Watch daemon: failed to compress {path}: {str(e)}")
+                continue
+            self.completed += 1
+            self.levels[level] += 1
+            self.bytes_in += original_size
+            self.bytes_out += compressed_size
+            self.recent.append((time.perf_counter(), original_size))
+            self.write_journal('done', path, signature, level=level, output=self.output_path(path),
+                               compressed_size=compressed_size,
+                               seconds=round(time.perf_counter() - start, 6))
+
+    def stats(self):
+        """Backlog, totals and the throughput of the recent jobs"""
+        now = time.perf_counter()
+        while self.recent and self.recent[0][0] < now - THROUGHPUT_WINDOW:
+            self.recent.popleft()
+        window = min(THROUGHPUT_WINDOW, now - self.started) if self.started else 0.0
+        return {
+            'settling': len(self.settling),
+            'queued': len(self.queue),
+            'running': len(self.running),
+            'backlog': len(self.settling) + len(self.queue) + len(self.running),
+            'completed': self.completed,
+            'failed': self.failed,
+            'level_counts': {str(level): count for level, count in self.levels.items()},
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'files_per_second': len(self.recent) / window if window > 0 else 0.0,
+            'bytes_per_second': sum(size for _, size in self.recent) / window if window > 0 else 0.0,
+            'uptime': now - self.started if self.started else 0.0,
+        }
+
+    def write_status(self):
+        if self.status_path:
+            temp_path = self.status_path + '.part'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.stats(), f)
+            os.replace(temp_path, self.status_path)
+
+    def run(self, max_polls=None):
+        """Watch until stop() is called (or after max_polls polls), then finish the running jobs"""
+        self.load_journal()
+        self.pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        self.started = time.perf_counter()
+        print(f"Watch daemon: watching {', '.join(self.directories)} "
+              f"({self.max_workers} workers, every {self.poll_interval} s)")
+        polls = 0
+        try:
+            while not self.stop_event.is_set() and (max_polls is None or polls < max_polls):
+                next_poll = time.perf_counter() + self.poll_interval
+                self.poll()
+                polls += 1
+                self.submit_jobs()
+                self.write_status()
+                while not self.stop_event.is_set() and time.perf_counter() < next_poll:
+                    self.collect(next_poll - time.perf_counter())
+                    self.submit_jobs()
+            # the jobs in the pool are finished, queued files stay in the journal
+            while self.running:
+                self.collect(None)
+            self.write_status()
+        finally:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+            self.journal.close()
+        stats = self.stats()
+        print(f"Watch daemon: stopped ({stats['completed']} compressed, {stats['failed']} failed, "
+              f"{stats['queued']} left in the queue)")
+        return stats
+
+    def stop(self, *args):
+        self.stop_event.set()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compress the files that land in watched directories")
+    parser.add_argument('directories', nargs='+')
+    parser.add_argument('-o', '--output', help="output directory (default: next to every file)")
+    parser.add_argument('--journal')
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--interval', type=float, default=1.0, help="seconds between polls")
+    parser.add_argument('--status', help="JSON file the counters are written to")
+    args = parser.parse_args()
+    daemon = WatchDaemon(args.directories, args.output, args.journal, args.workers,
+                         poll_interval=args.interval, status_path=args.status)
+    signal.signal(signal.SIGTERM, daemon.stop)
+    signal.signal(signal.SIGINT, daemon.stop)
+    daemon.run()